@@ -0,0 +1,36 @@
+"""Benchmark import time of the offline models, checking automation stays unimported."""
+
+from re import fullmatch
+from subprocess import run
+from sys import executable, stdout
+
+STATEMENT = "from google_photos_takeout_model.models.albums import Album"
+DEFERRED = ("playwright", "stamina")
+"""Packages that the offline models should not import."""
+TOP = 15
+
+
+def main():
+    stderr = run(
+        args=[executable, "-X", "importtime", "-c", STATEMENT],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    total = 0
+    imports: list[tuple[int, str]] = []
+    for line in stderr.splitlines():
+        if match := fullmatch(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)", line):
+            cumulative, indent, module = match.groups()
+            imports.append((int(cumulative), module))
+            if not indent:
+                total += int(cumulative)
+    stdout.write(f"{STATEMENT}: {total / 1e3:.1f} ms\n")
+    for us, module in sorted(imports, reverse=True)[:TOP]:
+        stdout.write(f"{us / 1e3:8.1f} ms  {module}\n")
+    if deferred := sorted({m for _, m in imports if m.split(".")[0] in DEFERRED}):
+        raise SystemExit(f"Imported deferred packages: {', '.join(deferred)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,69 @@
 """Model for Google Takeout data for Google Photos."""
 
+from __future__ import annotations
+
 from asyncio import sleep
 from dataclasses import dataclass
 from json import dumps, loads
 from pathlib import Path
-from typing import Literal, Self, get_args
-
-from playwright.async_api import Locator
+from re import compile  # noqa: A004
+from typing import TYPE_CHECKING, Literal, Self, get_args
 
 from google_photos_takeout_model.pw import ITEM_SELECTION_THRESHOLD, LONG_WAIT, WAIT
 
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from playwright.async_api import Locator
+
 type Kinds = Literal[
-    "copied", "deleted", "in", "large", "left", "shared", "were-shared"
+    "copied", "deleted", "in", "large", "left", "links", "shared", "were-shared"
 ]
 kinds = get_args(Kinds)
 
 
+BATCHES = Path("albums-batches.json")
+"""Items already handled in batches, for albums too large to select all at once."""
+
+SELECT_BATCH = """
+({ done, limit }) => {
+  const main = [...document.querySelectorAll("main, [role='main']")].at(-1);
+  main?.querySelectorAll("[data-batch]").forEach(box => box.removeAttribute("data-batch"));
+  const handled = new Set(done);
+  const batch = [];
+  for (const box of main?.querySelectorAll("[role='checkbox'], input[type='checkbox']") ?? []) {
+    if (batch.length >= limit) break;
+    if (box.getAttribute("aria-checked") === "true" || box.checked) continue;
+    const href = box
+      .closest(":has(a[href*='/photo/'])")
+      ?.querySelector("a[href*='/photo/']")?.href;
+    if (!href || handled.has(href)) continue;
+    box.setAttribute("data-batch", batch.length);
+    batch.push(href);
+  }
+  return batch;
+}
+"""
+"""Mark rendered, unselected checkboxes for items not yet handled, returning their URLs."""
+
+SCROLL_ALBUM = """
+async ({ timeout }) => {
+  const main = [...document.querySelectorAll("main, [role='main']")].at(-1);
+  const last = () => [...(main?.querySelectorAll("a[href*='/photo/']") ?? [])].at(-1);
+  const before = last()?.href;
+  last()?.scrollIntoView({ block: "end" });
+  const start = performance.now();
+  while (performance.now() - start < timeout) {
+    if (last()?.href !== before) return true;
+    await new Promise(resolve => setTimeout(resolve, 50));
+  }
+  return false;
+}
+"""
+"""Scroll the album grid, returning whether more items were rendered."""
+SCROLL_ALBUM_TIMEOUT = 5_000
+
+
 @dataclass
 class Albums:
     path: Path
@@ -28,6 +76,42 @@ class Albums:
         return cls(path, loads(path.read_text(encoding="utf-8")))
 
 
+@dataclass(kw_only=True)
+class Checkpoint:
+    """Save progress every so many finished items.
+
+    A crash then loses at most the items finished since the last save.
+    """
+
+    interval: int
+    pending: int = 0
+
+    def step(self):
+        self.pending += 1
+        if self.pending >= self.interval:
+            self.write()
+
+    def write(self):
+        if self.pending:
+            self.save()
+            self.pending = 0
+
+    def save(self):
+        raise NotImplementedError
+
+
+@dataclass
+class Batches:
+    path: Path
+    contents: dict[str, list[str]]
+
+    @classmethod
+    def from_path(cls, path: Path = BATCHES) -> Self:
+        if not path.exists():
+            path.write_text(encoding="utf-8", data="{}")
+        return cls(path, loads(path.read_text(encoding="utf-8")))
+
+
 async def select_all_photos(loc: Locator):
     # ? Select first checkbox
     await loc.page.get_by_role("checkbox").first.click()
@@ -47,13 +131,87 @@ async def select_all_photos(loc: Locator):
 
 
 async def many_photos_selected(loc: Locator) -> bool:
-    return bool(selected := await loc.page.get_by_text("selected").text_content()) and (
-        int(selected.split()[0]) > ITEM_SELECTION_THRESHOLD
+    return await get_selected_count(loc) > ITEM_SELECTION_THRESHOLD
+
+
+async def get_selected_count(loc: Locator) -> int:
+    return (
+        int(selected.split()[0])
+        if (selected := await loc.page.get_by_text("selected").text_content())
+        else 0
+    )
+
+
+async def select_photo_batch(
+    loc: Locator, done: set[str], size: int = ITEM_SELECTION_THRESHOLD
+) -> list[str]:
+    """Select up to `size` photos not in `done`, scrolling through the album as needed.
+
+    Selections stay below the threshold at which Google Photos starts batching, and
+    the selected count is checked against the photos that were clicked.
+    """
+    batch: list[str] = []
+    while len(batch) < size:
+        if not (
+            found := await loc.page.evaluate(
+                SELECT_BATCH, {"done": [*done, *batch], "limit": size - len(batch)}
+            )
+        ):
+            if await loc.page.evaluate(SCROLL_ALBUM, {"timeout": SCROLL_ALBUM_TIMEOUT}):
+                continue
+            break
+        for i in range(len(found)):
+            await loc.page.locator(f"[data-batch='{i}']").click()
+        batch.extend(found)
+    if batch and (selected := await get_selected_count(loc)) != len(batch):
+        raise RuntimeError(f"Selected {selected} photos instead of {len(batch)}.")
+    return batch
+
+
+async def photo_batches(
+    key: str, loc: Locator, batches: Batches | None = None
+) -> AsyncIterator[list[str]]:
+    """Select and yield batches of photos not yet handled, recording each once handled.
+
+    Handled photos are tracked by URL under `key`, so an interrupted run resumes where it
+    left off. The album is not reloaded between batches, so each batch is selected from
+    where the last one ended rather than scrolling past every handled photo again.
+    """
+    batches = batches or Batches.from_path()
+    done = set(batches.contents.get(key, []))
+    while batch := await select_photo_batch(loc, done):
+        yield batch
+        done.update(batch)
+        update_batches(batches, key, sorted(done))
+
+
+async def get_album_item_count(loc: Locator, url: str) -> int:
+    """Get the number of items in an album, opened on a separate page."""
+    page = await loc.page.context.new_page()
+    try:
+        await page.goto(url)
+        count = await page.get_by_text(
+            compile(r"^\d[\d,]* items?$")
+        ).first.text_content()
+    finally:
+        await page.close()
+    return int(count.split()[0].replace(",", "")) if count else 0
+
+
+def update_batches(batches: Batches, title: str, urls: list[str]):
+    batches.contents[title] = urls
+    batches.path.write_text(
+        encoding="utf-8",
+        data=f"{dumps(batches.contents, indent=2, ensure_ascii=False)}\n",
     )
 
 
 def update_album_list(albums: Albums, title: str, url: str):
     albums.contents[title] = url
+    write_album_list(albums)
+
+
+def write_album_list(albums: Albums):
     albums.path.write_text(
         encoding="utf-8",
         data=f"{dumps(albums.contents, indent=2, ensure_ascii=False)}\n",
@@ -76,3 +234,10 @@ async def more_options(loc: Locator):
 
 def loc_more_options(loc: Locator) -> Locator:
     return loc.get_by_role("button", name="More options")
+
+
+def main():
+    """Run the command-line interface, importing it only when needed."""
+    from google_photos_takeout_model.cli import main  # noqa: PLC0415
+
+    main()
@@ -0,0 +1,155 @@
+"""Detect changed albums from cheap HTTP fetches of their pages."""
+
+from __future__ import annotations
+
+from asyncio import Semaphore, TaskGroup, run
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from html import unescape
+from json import dumps, loads
+from pathlib import Path
+from re import findall, finditer, match
+from sys import argv
+from typing import Self
+
+from playwright.async_api import APIRequestContext, Error
+from pydantic import BaseModel
+from tqdm import tqdm
+
+from google_photos_takeout_model.pw import request_context
+
+URLS = argv[1:]
+CONNECTIONS = 16
+ITEM_ID = r"/photo/([\w-]+)"
+META = r'<meta[^>]*?property="og:(?P<name>\w+)"[^>]*?content="(?P<content>[^"]*)"'
+ITEM_COUNT = "items added to shared album"
+"""Text of the `og:description` that starts with the item count."""
+COUNT = r"\d[\d,]*"
+"""Item count, with thousands separated by commas."""
+
+
+class Fingerprint(BaseModel):
+    """Cheap summary of an album page that changes when the album does."""
+
+    title: str = ""
+    count: int = 0
+    first: str = ""
+    """ID of the first item in the album."""
+    last: str = ""
+    """ID of the last item in the album, if the page links every item."""
+
+
+@dataclass
+class Fingerprints:
+    path: Path
+    contents: dict[str, Fingerprint]
+
+    @classmethod
+    def from_path(cls, path: Path) -> Self:
+        if not path.exists():
+            path.write_text(encoding="utf-8", data="{}")
+        return cls(
+            path,
+            {
+                url: Fingerprint(**fingerprint)
+                for url, fingerprint in loads(path.read_text(encoding="utf-8")).items()
+            },
+        )
+
+
+async def main(urls: list[str] = URLS):
+    async with changed_albums(urls, get_fingerprints_path("check")) as changed:
+        for url in changed:
+            tqdm.write(url)
+
+
+def get_fingerprints_path(job: str) -> Path:
+    """Get fingerprints for a job, so one job's refresh doesn't hide changes from another."""
+    return Path(f"albums-fingerprints-{job}.json")
+
+
+@asynccontextmanager
+async def changed_albums(urls: list[str], path: Path) -> AsyncGenerator[list[str]]:
+    """Yield albums that changed since they were last handled, in their given order.
+
+    New fingerprints are saved only once the caller finishes without error. Albums whose
+    pages can't be fetched count as changed, but have no fingerprint saved.
+    """
+    stored = Fingerprints.from_path(path)
+    current = await get_fingerprints(urls)
+    changed = [
+        url
+        for url in urls
+        if (fingerprint := current.get(url)) is None
+        or stored.contents.get(url) != fingerprint
+    ]
+    tqdm.write(f"{len(changed)} of {len(urls)} albums changed.")
+    yield changed
+    update_fingerprints(
+        stored, {url: current[url] for url in changed if url in current}
+    )
+
+
+def update_fingerprints(fingerprints: Fingerprints, changed: dict[str, Fingerprint]):
+    fingerprints.contents |= changed
+    contents = {url: fp.model_dump() for url, fp in fingerprints.contents.items()}
+    fingerprints.path.write_text(
+        encoding="utf-8", data=f"{dumps(contents, indent=2, ensure_ascii=False)}\n"
+    )
+
+
+async def get_fingerprints(
+    urls: list[str], connections: int = CONNECTIONS
+) -> dict[str, Fingerprint]:
+    """Fetch album pages concurrently over HTTP, without rendering them."""
+    limit = Semaphore(connections)
+    async with request_context() as request, TaskGroup() as tg:
+        tasks = {
+            url: tg.create_task(get_fingerprint(request, limit, url)) for url in urls
+        }
+    return {
+        url: fingerprint
+        for url, task in tasks.items()
+        if (fingerprint := task.result())
+    }
+
+
+async def get_fingerprint(
+    request: APIRequestContext, limit: Semaphore, url: str
+) -> Fingerprint | None:
+    async with limit:
+        try:
+            response = await request.get(url)
+        except Error:
+            return None
+        if not response.ok:
+            return None
+        return parse_fingerprint(await response.text())
+
+
+def parse_fingerprint(html: str) -> Fingerprint:
+    """Get the fingerprint of an album page as served, before it loads more items.
+
+    Pages of large albums only link their first items, so the last item linked isn't the
+    album's last. It's only kept if every item is linked, leaving the item count to tell
+    when items are added to or removed from large albums.
+    """
+    meta = {found["name"]: unescape(found["content"]) for found in finditer(META, html)}
+    description = meta.get("description", "")
+    count = (
+        int(found[0].replace(",", ""))
+        if ITEM_COUNT in description and (found := match(COUNT, description))
+        else 0
+    )
+    items = list(dict.fromkeys(findall(ITEM_ID, html)))
+    return Fingerprint(
+        title=meta.get("title", ""),
+        count=count,
+        first=items[0] if items else "",
+        last=items[-1] if items and len(items) >= count else "",
+    )
+
+
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,195 @@
+"""Command-line interface running jobs in one event loop with a shared browser."""
+
+from __future__ import annotations
+
+from asyncio import run, to_thread
+from collections.abc import Generator
+from contextlib import AsyncExitStack, contextmanager
+from dataclasses import dataclass, field
+from json import loads
+from pathlib import Path
+from time import perf_counter
+from typing import Annotated as Ann
+from typing import Literal
+
+from cappa import Arg, invoke_async
+from playwright.async_api import BrowserContext
+from tqdm import tqdm
+
+from google_photos_takeout_model.changes import changed_albums, get_fingerprints_path
+from google_photos_takeout_model.clear_albums import clear
+from google_photos_takeout_model.copy_albums import copy_albums
+from google_photos_takeout_model.delete_albums import leave_or_delete_albums
+from google_photos_takeout_model.download import download, gather_sources
+from google_photos_takeout_model.get_media_metadata import login_and_reveal_info
+from google_photos_takeout_model.get_media_metadata2 import (
+    PAGES,
+    SHARDS,
+    scrape,
+    scrape_queued,
+    scrape_sharded,
+)
+from google_photos_takeout_model.models.albums import Album, get_albums
+from google_photos_takeout_model.models.archives import TAKEOUT_ROOT, Archive
+from google_photos_takeout_model.normalize_albums import normalize
+from google_photos_takeout_model.pw import context, locator2
+from google_photos_takeout_model.share_albums import share_albums
+from google_photos_takeout_model.validate_albums import validate
+from google_photos_takeout_model.writeback import writeback
+
+type Job = Literal[
+    "normalize",
+    "scrape",
+    "download",
+    "copy",
+    "delete",
+    "clear",
+    "share",
+    "load",
+    "writeback",
+    "validate",
+]
+MUTATING: tuple[Job, ...] = (
+    "normalize",
+    "scrape",
+    "download",
+    "copy",
+    "delete",
+    "clear",
+    "share",
+    "writeback",
+)
+"""Jobs that change Google Photos, or write album JSON, media files or metadata."""
+OFFLINE: tuple[Job, ...] = ("load", "writeback", "validate")
+"""Jobs that don't need a browser."""
+DETECTED: tuple[Job, ...] = ("normalize", "scrape")
+"""Jobs that can skip albums unchanged since they last ran."""
+
+
+@dataclass
+class GooglePhotosTakeoutModel:
+    """Run jobs in order, sharing one login and browser context between them."""
+
+    jobs: Ann[list[Job], Arg(help="Jobs to run in order.")]
+    urls: Ann[Path | None, Arg(long=True, help="JSON file listing album URLs.")] = None
+    scraped: Ann[
+        list[Path],
+        Arg(long=True, help="Scraped album JSON files to download or validate."),
+    ] = field(default_factory=list)
+    takeout: Ann[
+        Path | None, Arg(long=True, help="Directory of takeout albums to load.")
+    ] = None
+    archives: Ann[
+        list[Path], Arg(long=True, help="Takeout archive parts to load albums from.")
+    ] = field(default_factory=list)
+    pages: Ann[int, Arg(long=True, help="Pages to scrape concurrently.")] = PAGES
+    overwrite: Ann[bool, Arg(long=True, help="Scrape items already scraped.")] = False
+    queued: Ann[bool, Arg(long=True, help="Scrape from the work queue.")] = False
+    changed: Ann[
+        bool, Arg(long=True, help="Normalize and scrape only albums that changed.")
+    ] = False
+    shards: Ann[
+        int, Arg(long=True, help="Scrape in this many processes, each with a browser.")
+    ] = SHARDS
+    headed: Ann[bool, Arg(long=True, help="Show the browser.")] = False
+    dry_run: Ann[
+        bool, Arg(long=True, help="Time jobs, skipping those that change anything.")
+    ] = False
+
+    async def __call__(self):
+        jobs: list[Job] = [
+            job for job in self.jobs if not (self.dry_run and job in MUTATING)
+        ]
+        for job in set(self.jobs) - set(jobs):
+            tqdm.write(f"{job}: skipped in dry run")
+        async with AsyncExitStack() as stack:
+            ctx = None
+            if any(job not in OFFLINE for job in jobs):
+                await login_and_reveal_info()
+                ctx = await stack.enter_async_context(context(not self.headed))
+            for job in jobs:
+                with timed(job):
+                    await self.run(job, ctx)
+
+    async def run(self, job: Job, ctx: BrowserContext | None):
+        if job in OFFLINE:
+            return self.run_offline(job)
+        if not ctx:
+            raise RuntimeError(f"Browser context required for {job}.")
+        if self.changed and job in DETECTED:
+            async with changed_albums(
+                self.album_urls, get_fingerprints_path(job)
+            ) as urls:
+                return await self.run_online(job, ctx, urls)
+        return await self.run_online(job, ctx, self.album_urls)
+
+    async def run_online(self, job: Job, ctx: BrowserContext, urls: list[str]):
+        match job:
+            case "normalize":
+                await normalize(ctx, urls)
+            case "scrape" if self.shards > 1:
+                await to_thread(
+                    scrape_sharded, urls, self.shards, self.pages, self.overwrite
+                )
+            case "scrape" if self.queued:
+                await scrape_queued(ctx, urls, self.pages, self.overwrite)
+            case "scrape":
+                await scrape(ctx, urls, self.pages, self.overwrite)
+            case "download":
+                await gather_sources(ctx, self.scraped, self.pages)
+                await download(self.scraped)
+            case "clear":
+                await clear(ctx, urls)
+            case "share":
+                await share_albums(ctx, pages=self.pages)
+            case "copy":
+                async with locator2(ctx) as loc:
+                    await copy_albums(loc)
+            case "delete":
+                async with locator2(ctx) as loc:
+                    await leave_or_delete_albums(loc)
+            case _:
+                raise ValueError(f"{job} doesn't need a browser.")
+
+    @property
+    def album_urls(self) -> list[str]:
+        return loads(self.urls.read_text(encoding="utf-8")) if self.urls else []
+
+    def run_offline(self, job: Job):
+        if job == "validate":
+            validate(self.scraped, dry_run=self.dry_run)
+            return
+        if job == "writeback" and self.archives:
+            raise ValueError("Writeback requires an extracted takeout directory.")
+        albums = self.load()
+        if job == "writeback":
+            writeback(item for album in albums for item in album.media_items)
+
+    def load(self) -> list[Album]:
+        if self.archives:
+            with Archive.from_paths(self.archives) as archive:
+                albums = get_albums(TAKEOUT_ROOT, archive)
+        elif self.takeout:
+            albums = get_albums(self.takeout)
+        else:
+            raise ValueError("Takeout directory or archives required to load albums.")
+        tqdm.write(
+            f"Loaded {len(albums)} albums with "
+            f"{sum(len(album.media_items) for album in albums)} media items."
+        )
+        return albums
+
+
+@contextmanager
+def timed(job: Job) -> Generator[None]:
+    start = perf_counter()
+    yield
+    tqdm.write(f"{job}: {perf_counter() - start:.1f} s")
+
+
+def main():
+    run(invoke_async(GooglePhotosTakeoutModel))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,21 +9,32 @@ from tqdm import tqdm
 
 from google_photos_takeout_model import (
     Albums,
+    Batches,
     Kinds,
+    get_album_item_count,
     get_albums,
     many_photos_selected,
+    more_options,
+    photo_batches,
     select_all_photos,
     update_album_list,
 )
 from google_photos_takeout_model.pw import GPHOTOS_BASE_URL, WAIT, logged_in
 
+COPYING_SUFFIX = " (copying)"
+"""Suffix distinguishing a partial copy from its source in the album picker."""
+
 
 async def main():
-    albs = get_albums()
     async with logged_in() as loc:
-        for title, url in tqdm(albs["in"].contents.items()):
-            await loc.page.goto(url)
-            await copy_album(title, albs, loc)
+        await copy_albums(loc)
+
+
+async def copy_albums(loc: Locator):
+    albs = get_albums()
+    for title, url in tqdm(albs["in"].contents.items()):
+        await loc.page.goto(url)
+        await copy_album(title, albs, loc)
 
 
 async def copy_album(title: str, albs: dict[Kinds, Albums], loc: Locator):
@@ -38,8 +49,51 @@ async def copy_album(title: str, albs: dict[Kinds, Albums], loc: Locator):
     unlv_url = loc.page.url
     await select_all_photos(loc)
     if await many_photos_selected(loc):
-        return update_album_list(albs["large"], title, loc.page.url)
-    # ? Add all images to a new album
+        await loc.page.goto(unlv_url)
+        await copy_large_album(title, albs, loc)
+    else:
+        await add_to_new_album(title, loc)
+        update_album_list(albs["copied"], title, loc.page.url)
+    # ? Record albums that were shared
+    if shared:
+        update_album_list(albs["shared"], title, unlv_url)
+        update_album_list(albs["were-shared"], title, loc.page.url)
+
+
+async def copy_large_album(
+    title: str, albs: dict[Kinds, Albums], loc: Locator, batches: Batches | None = None
+):
+    """Copy an album too large to select at once by adding photos in batches.
+
+    Photos already copied are tracked by URL, so an interrupted copy resumes where it
+    left off. The copy is titled with a suffix until complete, so that later batches
+    can be added to it by name rather than to the source album. After each batch, the
+    copy is checked to have grown by the number of photos added.
+    """
+    unlv_url = loc.page.url
+    copying_title = f"{title}{COPYING_SUFFIX}"
+    copy_url = albs["copied"].contents.get(copying_title)
+    copied = await get_album_item_count(loc, copy_url) if copy_url else 0
+    async for batch in photo_batches(title, loc, batches):
+        if copy_url:
+            await add_to_album(copying_title, loc)
+        else:
+            await add_to_new_album(copying_title, loc)
+            copy_url = loc.page.url
+            update_album_list(albs["copied"], copying_title, copy_url)
+            # ? Creating the copy opens it, so return to the source for later batches
+            await loc.page.goto(unlv_url)
+        expected = copied + len(batch)
+        if (copied := await get_album_item_count(loc, copy_url)) != expected:
+            raise RuntimeError(f"Copy has {copied} photos instead of {expected}.")
+    if copy_url:
+        await loc.page.goto(copy_url)
+        await rename_album(title, loc)
+        update_album_list(albs["copied"], title, copy_url)
+
+
+async def add_to_new_album(title: str, loc: Locator):
+    # ? Add selected images to a new album
     await loc.page.get_by_label("Add to album", exact=True).click()
     await loc.page.get_by_role("menu").get_by_text("Album", exact=True).click()
     await loc.page.wait_for_timeout(WAIT)
@@ -51,12 +105,27 @@ async def copy_album(title: str, albs: dict[Kinds, Albums], loc: Locator):
     await album_title.click()
     await album_title.fill(title)
     await loc.page.get_by_label("Done").click()
-    # ? Update album list
-    update_album_list(albs["copied"], title, loc.page.url)
-    # ? Record albums that were shared
-    if shared:
-        update_album_list(albs["shared"], title, unlv_url)
-        update_album_list(albs["were-shared"], title, loc.page.url)
+
+
+async def add_to_album(title: str, loc: Locator):
+    # ? Add selected images to an existing album
+    await loc.page.get_by_label("Add to album", exact=True).click()
+    await loc.page.get_by_role("menu").get_by_text("Album", exact=True).click()
+    await loc.page.wait_for_timeout(WAIT)
+    await loc.page.get_by_role("option", name=title, exact=True).click()
+    # ? Wait for the selection to clear once images are added
+    await loc.page.get_by_label("Clear selection").wait_for(
+        state="hidden", timeout=60_000
+    )
+
+
+async def rename_album(title: str, loc: Locator):
+    await more_options(loc)
+    await loc.page.get_by_role("menuitem", name="Edit album").click()
+    album_title = loc.page.get_by_placeholder("Add a title")
+    await album_title.click()
+    await album_title.fill(title)
+    await loc.page.get_by_label("Done").click()
 
 
 if __name__ == "__main__":
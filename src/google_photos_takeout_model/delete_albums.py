@@ -8,11 +8,13 @@ from tqdm import tqdm
 from google_photos_takeout_model import (
     WAIT,
     Albums,
+    Batches,
     Kinds,
     get_albums,
     loc_more_options,
     many_photos_selected,
     more_options,
+    photo_batches,
     select_all_photos,
     update_album_list,
 )
@@ -20,13 +22,20 @@ from google_photos_takeout_model.pw import DELETE_ALBUM_TIMEOUT, logged_in
 
 # TODO: Implement as finite state machine, e.g. awaiting empty album depends on state.
 
+TRASHING_SUFFIX = " (trashing)"
+"""Suffix distinguishing photos trashed in batches from those copied, by album title."""
+
 
 async def main():
-    albs = get_albums()
     async with logged_in() as loc:
-        for title, url in tqdm(albs["in"].contents.items()):
-            await loc.page.goto(url)
-            await leave_or_delete_album(title, albs, loc)
+        await leave_or_delete_albums(loc)
+
+
+async def leave_or_delete_albums(loc: Locator):
+    albs = get_albums()
+    for title, url in tqdm(albs["in"].contents.items()):
+        await loc.page.goto(url)
+        await leave_or_delete_album(title, albs, loc)
 
 
 async def leave_or_delete_album(title: str, albs: dict[Kinds, Albums], loc: Locator):
@@ -35,12 +44,15 @@ async def leave_or_delete_album(title: str, albs: dict[Kinds, Albums], loc: Loca
         await delete_album(loc)
         return update_album_list(albs["deleted"], title, unlv_url)
     await select_all_photos(loc)
-    if await many_photos_selected(loc):
-        update_album_list(albs["large"], title, loc.page.url)
+    large = await many_photos_selected(loc)
     # ? Move all images to trash
     await more_options(loc)
     if await loc.page.get_by_text("Move to trash").count():
-        await move_to_trash(loc)
+        if large:
+            await loc.page.goto(unlv_url)
+            await trash_large_album(title, loc)
+        else:
+            await move_to_trash(loc)
         return update_album_list(albs["deleted"], title, unlv_url)
     await loc.page.get_by_label("Clear selection").click()
     # ? Leave album if it's not ours
@@ -55,17 +67,32 @@ async def leave_or_delete_album(title: str, albs: dict[Kinds, Albums], loc: Loca
     update_album_list(albs["deleted"], title, unlv_url)
 
 
+async def trash_large_album(title: str, loc: Locator, batches: Batches | None = None):
+    """Move photos of an album too large to select at once to trash in batches."""
+    async for _ in photo_batches(f"{title}{TRASHING_SUFFIX}", loc, batches):
+        await more_options(loc)
+        await trash_selected(loc)
+    await delete_emptied_album(loc)
+
+
 async def move_to_trash(loc: Locator):
-    move_to_trash = loc.page.get_by_text("Move to trash")
-    if await move_to_trash.count():
-        await move_to_trash.click()
-        await loc.page.get_by_role("button", name="Move to trash").click()
-        while await loc.page.get_by_text("Moving to trash").count():  # noqa: ASYNC110
-            await sleep(WAIT)
+    if await loc.page.get_by_text("Move to trash").count():
+        await trash_selected(loc)
     else:
         await loc.page.get_by_label("Delete album").click()
         await loc.page.get_by_role("button", name="Delete").click()
         return
+    await delete_emptied_album(loc)
+
+
+async def trash_selected(loc: Locator):
+    await loc.page.get_by_text("Move to trash").click()
+    await loc.page.get_by_role("button", name="Move to trash").click()
+    while await loc.page.get_by_text("Moving to trash").count():  # noqa: ASYNC110
+        await sleep(WAIT)
+
+
+async def delete_emptied_album(loc: Locator):
     waited = 0
     while (waited < DELETE_ALBUM_TIMEOUT) and (  # TODO: Use asyncio.Event()
         await loc_more_options(loc).count() or not await album_empty_after_deleting(loc)
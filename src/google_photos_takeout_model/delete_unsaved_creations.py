@@ -1,24 +1,138 @@
 from __future__ import annotations
 
 from asyncio import run
+from typing import Any
 
+from playwright.async_api import Locator, TimeoutError  # noqa: A004
+from tqdm import tqdm
+
+from google_photos_takeout_model import ITEM_SELECTION_THRESHOLD, get_selected_count
 from google_photos_takeout_model.pw import (
+    DELETE_ALBUM_TIMEOUT,
     GPHOTOS_BASE_URL,
+    INTERACT_TIMEOUT,
     logged_in,
 )
 
+MORE_OPTIONS = "More options"
+DELETED = """
+({ name, remaining }) => {
+  const dialog = document.querySelector("[role='dialog'], [role='alertdialog']");
+  if (
+    [...(dialog?.querySelectorAll("button, [role='button']") ?? [])].some(button =>
+      button.textContent.trim().startsWith("Delete")
+    )
+  )
+    return "confirm";
+  const options = [...document.querySelectorAll("button, [role='button']")].filter(
+    button => button.getAttribute("aria-label") === name
+  );
+  return options.length <= remaining && "deleted";
+}
+"""
+"""Whether deletion needs confirming, or took effect with deleted creations gone."""
+
 
 async def main():
     async with logged_in() as loc:
         await loc.page.goto(f"{GPHOTOS_BASE_URL}/unsaved")
-        options = loc.page.get_by_role("button", name="More options", exact=True)
-        delete = loc.page.get_by_role("menuitem", name="Delete permanently", exact=True)
-        n = -1
-        while (n := n + 1) < 1000 and await options.count():
-            await options.nth(n).hover(force=True)
-            await options.nth(n).click(force=True)
-            if await delete.is_visible():
-                await delete.click(force=True)
+        with tqdm(unit="creation", smoothing=0) as progress:
+            await delete_creations(loc, progress)
+
+
+async def delete_creations(loc: Locator, progress: tqdm[Any]):
+    """Delete creations in batches until none are left that can be deleted.
+
+    Creations that can't be deleted are skipped, so later selections start after them.
+    """
+    skipped = 0
+    while (creations := await count_creations(loc)) > skipped:
+        try:
+            if await loc.page.get_by_role("checkbox").count():
+                deleted = await delete_selected_creations(loc, skipped, creations)
+            else:
+                deleted = await delete_creation(loc, skipped, creations)
+        except TimeoutError:
+            # ? More creations were loaded in place of those deleted, so counts are off
+            tqdm.write("Deletion wasn't confirmed in time. Run again to continue.")
+            break
+        if not deleted:
+            skipped += 1
+        progress.update(deleted)
+
+
+async def count_creations(loc: Locator) -> int:
+    try:
+        await loc_options(loc).first.wait_for(timeout=INTERACT_TIMEOUT)
+    except TimeoutError:
+        return 0
+    return await loc_options(loc).count()
+
+
+async def delete_selected_creations(loc: Locator, first: int, creations: int) -> int:
+    boxes = loc.page.get_by_role("checkbox")
+    await boxes.nth(first).click()
+    if (last := min(await boxes.count(), first + ITEM_SELECTION_THRESHOLD) - 1) > first:
+        await loc.page.keyboard.down("Shift")
+        await boxes.nth(last).click()
+        await loc.page.keyboard.up("Shift")
+    selected = await get_selected_count(loc)
+    await loc_options(loc).nth(first).click()
+    if not await delete(loc, creations - selected):
+        await loc.page.keyboard.press("Escape")
+        await loc.page.get_by_label("Clear selection").click()
+        return 0
+    return selected
+
+
+async def delete_creation(loc: Locator, n: int, creations: int) -> int:
+    options = loc_options(loc).nth(n)
+    await options.hover(force=True)
+    await options.click(force=True)
+    if not await delete(loc, creations - 1):
+        await loc.page.keyboard.press("Escape")
+        return 0
+    return 1
+
+
+async def delete(loc: Locator, remaining: int) -> bool:
+    """Delete from an open menu, waiting until at most `remaining` creations are shown.
+
+    Raises `TimeoutError` if deletion isn't confirmed in time.
+    """
+    try:
+        await loc_delete(loc).click(timeout=INTERACT_TIMEOUT)
+    except TimeoutError:
+        return False
+    while (
+        await (
+            await loc.page.wait_for_function(
+                DELETED,
+                arg={"name": MORE_OPTIONS, "remaining": remaining},
+                timeout=1_000 * DELETE_ALBUM_TIMEOUT,
+            )
+        ).json_value()
+        == "confirm"
+    ):
+        await loc_confirm(loc).click()
+        await loc_confirm(loc).wait_for(state="hidden")
+    return True
+
+
+def loc_options(loc: Locator) -> Locator:
+    return loc.page.get_by_role("button", name=MORE_OPTIONS, exact=True)
+
+
+def loc_confirm(loc: Locator) -> Locator:
+    return (
+        loc.page.locator("[role='dialog'], [role='alertdialog']")
+        .get_by_role("button", name="Delete")
+        .first
+    )
+
+
+def loc_delete(loc: Locator) -> Locator:
+    return loc.page.get_by_role("menuitem", name="Delete permanently", exact=True)
 
 
 if __name__ == "__main__":
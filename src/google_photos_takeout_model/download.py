@@ -0,0 +1,284 @@
+"""Download originals of scraped media items without a browser per file."""
+
+from __future__ import annotations
+
+from asyncio import Lock, Semaphore, TaskGroup, run, to_thread
+from base64 import b64decode
+from collections import defaultdict
+from contextlib import ExitStack
+from dataclasses import dataclass
+from hashlib import file_digest, md5
+from http import HTTPStatus
+from itertools import cycle
+from json import loads
+from pathlib import Path
+from re import search
+from sys import argv
+from urllib.parse import unquote, urlparse
+
+from playwright.async_api import (
+    APIRequestContext,
+    APIResponse,
+    BrowserContext,
+    Error,
+    Locator,
+)
+from tqdm.asyncio import tqdm
+
+from google_photos_takeout_model import Albums, Checkpoint, write_album_list
+from google_photos_takeout_model.get_media_metadata import (
+    MediaItemNotFoundError,
+    add_progress_callbacks,
+    file_album,
+    get_image_preview_source,
+    get_media_item_source,
+    goto_media_item,
+    login_and_reveal_info,
+    slow_retry,
+)
+from google_photos_takeout_model.models.merged import get_item_id
+from google_photos_takeout_model.models.scraped import Album, MediaItemMetadata
+from google_photos_takeout_model.pw import context, locator_pool, request_context
+
+SCRAPED = [Path(arg) for arg in argv[1:]]
+"""Album JSON files written by the scrapers."""
+PAGES = 8
+DOWNLOADS = Path("downloads")
+DOWNLOADED = Path("downloads.json")
+"""Downloaded files, keyed by media item URL."""
+CONNECTIONS = 16
+PER_HOST = 4
+"""Concurrent downloads from each host."""
+CHUNK = 8 << 20
+"""Bytes per range request, bounding memory and the work lost to a failed request."""
+PART = ".part"
+WRITE_INTERVAL = 50
+"""Files downloaded between writing the list of downloads."""
+
+
+class DownloadError(Exception):
+    """Download failed, or doesn't match the size or checksum sent by the host."""
+
+
+@dataclass
+class DownloadsCheckpoint(Checkpoint):
+    """Record downloaded files, downloading those recorded since the last save again."""
+
+    downloads: Albums
+
+    def finish(self, url: str, path: Path):
+        self.downloads.contents[url] = path.as_posix()
+        self.step()
+
+    def save(self):
+        write_album_list(self.downloads)
+
+
+async def main(paths: list[Path] = SCRAPED, pages: int = PAGES):
+    await login_and_reveal_info()
+    async with context() as ctx:
+        await gather_sources(ctx, paths, pages)
+    await download(paths)
+
+
+async def gather_sources(ctx: BrowserContext, paths: list[Path], pages: int = PAGES):
+    """Get download and preview URLs of scraped items that don't have them yet."""
+    with ExitStack() as stack:
+        items = [
+            item
+            for path in paths
+            for item in stack.enter_context(file_album(path)).media_items_metadata
+            if item.item and not item.source
+        ]
+        progress = tqdm(smoothing=0, total=len(items))
+        async with (
+            locator_pool(ctx, min(pages, len(items))) as locators,
+            TaskGroup() as tg,
+        ):
+            add_progress_callbacks(
+                progress,
+                [
+                    tg.create_task(gather_source(loc, lock, item))
+                    for item, (loc, lock) in zip(items, cycle(locators), strict=False)
+                ],
+            )
+        progress.close()
+
+
+async def gather_source(loc: Locator, lock: Lock, item: MediaItemMetadata):
+    async with lock:
+        try:
+            await goto_media_item(loc, item.item)
+            source = await get_media_item_source(loc, item.details)
+            preview = await get_image_preview_source(loc) or ""
+        except MediaItemNotFoundError:
+            return
+        except Error as err:
+            # ? Leave the item without sources, so the next run gathers them again
+            tqdm.write(f"{item.item}: {err}")
+            return
+    item.source = source
+    item.preview = preview
+
+
+async def download(
+    paths: list[Path],
+    root: Path = DOWNLOADS,
+    connections: int = CONNECTIONS,
+    per_host: int = PER_HOST,
+):
+    """Download originals not yet downloaded, into a directory for each album.
+
+    Downloads are limited overall and for each host. Failed downloads are reported and
+    resumed from their partial files on the next run.
+    """
+    downloads = Albums.from_path(DOWNLOADED)
+    items = [
+        (root / alb.title, item)
+        for alb in (Album(**loads(path.read_text(encoding="utf-8"))) for path in paths)
+        for item in alb.media_items_metadata
+        if item.source and item.item not in downloads.contents
+    ]
+    checkpoint = DownloadsCheckpoint(downloads, interval=WRITE_INTERVAL)
+    limit = Semaphore(connections)
+    hosts: defaultdict[str, Semaphore] = defaultdict(lambda: Semaphore(per_host))
+    progress = tqdm(smoothing=0, total=len(items), unit="file")
+    try:
+        async with request_context() as request, TaskGroup() as tg:
+            add_progress_callbacks(
+                progress,
+                [
+                    tg.create_task(
+                        download_item(
+                            request,
+                            limit,
+                            hosts[urlparse(item.source).netloc],
+                            checkpoint,
+                            directory,
+                            item,
+                        )
+                    )
+                    for directory, item in items
+                ],
+            )
+    finally:
+        checkpoint.write()
+    progress.close()
+
+
+async def download_item(
+    request: APIRequestContext,
+    limit: Semaphore,
+    host: Semaphore,
+    checkpoint: DownloadsCheckpoint,
+    directory: Path,
+    item: MediaItemMetadata,
+):
+    # ? Wait for the host first, so busy hosts don't hold connections idle
+    async with host, limit:
+        try:
+            path = await fetch(
+                request, item.source, directory, get_item_id(item.item) or "original"
+            )
+        except (Error, DownloadError) as err:
+            tqdm.write(f"{item.item}: {err}")
+            return
+    checkpoint.finish(item.item, path)
+
+
+async def fetch(
+    request: APIRequestContext, url: str, directory: Path, name: str
+) -> Path:
+    """Download in ranges to a partial file, resuming one left by an earlier run.
+
+    Resuming re-requests the last byte already written, so that even a complete partial
+    file gets the size, checksum and filename sent with a response. Empty files have no
+    byte to request, so a response that the range can't be satisfied ends them too.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    part = directory / f"{name}{PART}"
+    start = max(part.stat().st_size - 1, 0) if part.exists() else 0
+    while True:
+        response = await get_range(request, url, start)
+        if response.status == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE and (
+            found := search(r"/(\d+)$", response.headers.get("content-range", ""))
+        ):
+            total = int(found[1])
+            part.touch()
+            break
+        if not response.ok:
+            raise DownloadError(f"HTTP {response.status} {response.status_text}")
+        body = await response.body()
+        if response.status == HTTPStatus.PARTIAL_CONTENT:
+            await to_thread(write, part, body, start)
+            start += len(body)
+            total = int(response.headers["content-range"].rpartition("/")[2])
+        else:
+            # ? The host ignored the range and sent the whole file
+            await to_thread(write, part, body, 0)
+            start = total = len(body)
+        if start >= total:
+            break
+    await verify(part, total, response)
+    path = directory / (get_filename(response) or name)
+    if path.exists():
+        path = path.with_stem(f"{path.stem}-{name}")
+    return part.replace(path)
+
+
+@slow_retry(Error)
+async def get_range(request: APIRequestContext, url: str, start: int) -> APIResponse:
+    return await request.get(
+        url,
+        headers={"Range": f"bytes={start}-{start + CHUNK - 1}"},
+        fail_on_status_code=False,
+    )
+
+
+def write(path: Path, data: bytes, offset: int):
+    with path.open("r+b" if path.exists() else "wb") as file:
+        file.seek(offset)
+        file.write(data)
+        file.truncate()
+
+
+async def verify(path: Path, total: int, response: APIResponse):
+    """Check the size, and the MD5 if the host sent one for the whole file."""
+    if (size := path.stat().st_size) != total:
+        raise DownloadError(f"Downloaded {size} of {total} bytes.")
+    if not (expected := get_md5(response)):
+        return
+    with path.open("rb") as file:
+        actual = (
+            await to_thread(file_digest, file, lambda: md5(usedforsecurity=False))
+        ).digest()
+    if actual != expected:
+        path.unlink()
+        raise DownloadError("Checksum mismatch, discarded the download.")
+
+
+def get_md5(response: APIResponse) -> bytes | None:
+    """Get the MD5 of the whole file from Google's hash header, or from `Content-MD5`.
+
+    `Content-MD5` describes the body, so it only applies when the whole file was sent.
+    """
+    if found := search(r"md5=([^,\s]+)", response.headers.get("x-goog-hash", "")):
+        return b64decode(found[1])
+    if response.status == HTTPStatus.OK and (
+        content_md5 := response.headers.get("content-md5")
+    ):
+        return b64decode(content_md5)
+    return None
+
+
+def get_filename(response: APIResponse) -> str:
+    disposition = response.headers.get("content-disposition", "")
+    if found := search(r"filename\*=UTF-8''([^;]+)", disposition):
+        return Path(unquote(found[1])).name
+    if found := search(r'filename="?([^";]+)"?', disposition):
+        return Path(found[1]).name
+    return ""
+
+
+if __name__ == "__main__":
+    run(main())
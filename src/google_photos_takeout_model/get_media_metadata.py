@@ -10,15 +10,16 @@ from pathlib import Path
 from re import compile  # noqa: A004
 from sys import argv
 from typing import Any, Literal, TypeVar
+from urllib.parse import urlparse
 
 from playwright.async_api import Locator, TimeoutError  # noqa: A004
-from pydantic import BaseModel, Field
 from stamina import retry
 from stamina.instrumentation import set_on_retry_hooks
 from tqdm.asyncio import tqdm as atqdm
 from tqdm.std import tqdm
 
 from google_photos_takeout_model import WAIT, dumps
+from google_photos_takeout_model.models.scraped import Album, MediaItemMetadata
 from google_photos_takeout_model.pw import (
     INTERACT_TIMEOUT,
     STORAGE_STATE,
@@ -47,18 +48,80 @@ def slow_retry(*on: type[Exception]):
     return retry(on=on, attempts=100, timeout=450, wait_max=50)
 
 
-class MediaItemMetadata(BaseModel):
-    item: str = ""
-    people: list[str] = Field(default_factory=list)
-    albums: list[str] = Field(default_factory=list)
-    details: list[str] = Field(default_factory=list)
-    position: str = ""
-
-
-class Album(BaseModel):
-    title: str = ""
-    item: str = ""
-    media_items_metadata: list[MediaItemMetadata] = Field(default_factory=list)
+class MediaItemNotFoundError(Exception):
+    """Media item page is missing, e.g. the item was deleted."""
+
+
+INFO_PANEL_FIELDS = """
+panel => {
+  const name = el => el.getAttribute("aria-label") ?? el.textContent;
+  const links = [...panel.querySelectorAll("a")];
+  return {
+    albums: links.filter(a => /\\d+\\sitems/.test(name(a))).map(a => a.innerText),
+    details: [...panel.querySelectorAll("div")]
+      .filter(div => div.querySelector(":scope > dt > svg"))
+      .map(div => div.innerText),
+    people: links.filter(a => name(a).includes("Photo of ")).map(a => a.innerText),
+  };
+}
+"""
+"""Extract info panel fields matching `loc_albums_containing_item`, `loc_details` and `loc_people`."""
+
+ITEM_METADATA = """
+async ({ timeout, peopleTimeout }) => {
+  const fields = INFO_PANEL_FIELDS;
+  const named = (el, name) =>
+    (el.getAttribute("aria-label") ?? el.textContent).includes(name);
+  const panel = () =>
+    [...([...document.querySelectorAll("main, [role='main']")].at(-1)
+      ?.querySelectorAll("c-wiz") ?? [])]
+      .filter(cwiz => [...cwiz.querySelectorAll("button, [role='button']")]
+        .some(button => named(button, "Close info")))
+      .at(-1);
+  const position = () =>
+    [...document.querySelectorAll("a")].find(a => named(a, "Map"))
+      ?.querySelector("[position]")?.getAttribute("position") ?? "";
+  const start = performance.now();
+  while (performance.now() - start < timeout) {
+    const info = panel();
+    if (info) {
+      const item = { ...fields(info), position: position() };
+      const located = !item.position || item.details.at(-1);
+      const waitedForPeople = performance.now() - start > peopleTimeout;
+      if (item.albums.length && located && (item.people.length || waitedForPeople))
+        return item;
+    }
+    await new Promise(resolve => setTimeout(resolve, 50));
+  }
+  return null;
+}
+""".replace("INFO_PANEL_FIELDS", INFO_PANEL_FIELDS.strip())
+"""Extract item metadata once albums, location, and people have loaded, or `null`."""
+ITEM_METADATA_TIMEOUT = 10_000
+PEOPLE_TIMEOUT = 2_000
+"""Items may have no people, so stop waiting for them after this long."""
+
+ALBUM_MEDIA_ITEMS = """
+async ({ count, idleTimeout }) => {
+  const urls = new Set();
+  let idleSince = performance.now();
+  while (urls.size < count && performance.now() - idleSince < idleTimeout) {
+    const links = [
+      ...([...document.querySelectorAll("main, [role='main']")].at(-1)
+        ?.querySelectorAll("a[href*='/photo/']") ?? []),
+    ];
+    const found = urls.size;
+    links.forEach(link => urls.add(link.href));
+    if (urls.size > found) idleSince = performance.now();
+    links.at(-1)?.scrollIntoView({ block: "end" });
+    await new Promise(resolve => setTimeout(resolve, 50));
+  }
+  return [...urls];
+}
+"""
+"""Collect item URLs matching `loc_album_media_items` by scrolling the album grid once."""
+ALBUM_MEDIA_ITEMS_IDLE_TIMEOUT = 5_000
+"""Stop scrolling if no new items load for this long."""
 
 
 async def main(urls: list[str] = URLS, overwrite: bool = OVERWRITE):
@@ -113,7 +176,11 @@ async def click_first_photo(loc):
 @asynccontextmanager
 async def albums(
     locs: cycle[tuple[Locator, Lock]], progress: atqdm, urls: list[str]
-) -> AsyncGenerator[list[Album]]:
+) -> AsyncGenerator[list[tuple[Album, Path]]]:
+    """Get albums with their files, writing them once done with.
+
+    Albums sharing a title in this run get files named by their IDs as well.
+    """
     progress.total += len(urls)
     tasks: list[Task[tuple[Album, Path]]] = []
     async with TaskGroup() as tg:
@@ -123,9 +190,14 @@ async def albums(
         )
         add_progress_callbacks(progress, tasks)
     progress.total -= len(urls)
-    albums = [task.result() for task in tasks]
+    albums: list[tuple[Album, Path]] = []
+    urls_by_path: dict[Path, str] = {}
+    for album, path in (task.result() for task in tasks):
+        if urls_by_path.setdefault(path, album.item) != album.item:
+            path = get_album_id_path(album.title, album.item)
+        albums.append((album, path))
     try:
-        yield [album for album, _ in albums]
+        yield albums
     finally:
         for album, path in albums:
             write_album(path, album)
@@ -154,21 +226,54 @@ async def album(loc: Locator, url: str) -> AsyncGenerator[Album]:
 
 
 async def get_album(loc: Locator, lock: Lock, url: str) -> tuple[Album, Path]:
-    await slow_retry(TimeoutError)(loc.page.goto)(url)
-    title = (await loc.page.title()).removesuffix(" - Google Photos")
-    path = Path(f"{title}.json")
-    alb = (
-        Album(**loads(path.read_text(encoding="utf-8")))
-        if path.exists()
-        else Album(title=title, item=url)
-    )
     async with lock:
+        await slow_retry(TimeoutError)(loc.page.goto)(url)
+        title = (await loc.page.title()).removesuffix(" - Google Photos")
+        path = get_album_path(title, url)
+        alb = (
+            Album(**loads(path.read_text(encoding="utf-8")))
+            if path.exists()
+            else Album(title=title, item=url)
+        )
         items = await get_item_count(loc)
-    if not len(alb.media_items_metadata):
-        alb.media_items_metadata.extend(MediaItemMetadata() for _ in range(items))
+        if not len(alb.media_items_metadata):
+            alb.media_items_metadata.extend(MediaItemMetadata() for _ in range(items))
+        if not all(item.item for item in alb.media_items_metadata):
+            await fill_album_media_items(loc, alb, items)
     return (alb, path)
 
 
+def get_album_path(title: str, url: str = "") -> Path:
+    """Get the file of an album, by title unless an album at another URL has it."""
+    path = Path(f"{title}.json")
+    if url and path.exists() and not is_album_file(path, url):
+        return get_album_id_path(title, url)
+    return path
+
+
+def get_album_id_path(title: str, url: str) -> Path:
+    """Get the file of an album by title and ID, for albums sharing a title."""
+    return Path(f"{title} ({urlparse(url).path.rstrip('/').rpartition('/')[2]}).json")
+
+
+def is_album_file(path: Path, url: str) -> bool:
+    return Album(**loads(path.read_text(encoding="utf-8"))).item == url
+
+
+async def fill_album_media_items(loc: Locator, alb: Album, items: int):
+    """Fill in missing item URLs so items can be scraped without album navigation."""
+    urls = await get_album_media_items(loc, items)
+    for item, url in zip(alb.media_items_metadata, urls, strict=False):
+        item.item = item.item or url
+
+
+async def get_album_media_items(loc: Locator, items: int) -> list[str]:
+    return await loc.page.evaluate(
+        ALBUM_MEDIA_ITEMS,
+        {"count": items, "idleTimeout": ALBUM_MEDIA_ITEMS_IDLE_TIMEOUT},
+    )
+
+
 @contextmanager
 def file_album(path: Path) -> Generator[Album]:
     alb = Album(**loads(path.read_text(encoding="utf-8")))
@@ -191,40 +296,31 @@ async def expect_navigation(loc: Locator):
         yield
 
 
+async def goto_media_item(loc: Locator, url: str):
+    response = await slow_retry(TimeoutError)(loc.page.goto)(url)
+    if response and response.status == 404:
+        raise MediaItemNotFoundError(f"Media item not found: {url}")
+
+
 @slow_retry(RuntimeError, TimeoutError)
 async def update_media_item_metadata(loc: Locator, item: MediaItemMetadata):
-    # TODO: Handle 404
-    if not (albums := await loc_albums_containing_item(loc).all_inner_texts()):
-        raise RuntimeError("Albums element not loaded.")
-    position = (
-        (await map.locator("[position]").first.get_attribute("position") or "")
-        if await (map := loc_map(loc)).count()  # noqa: A001
-        else ""
-    )
-    details = await loc_details(loc).all_inner_texts()
-    if position and not details[-1]:
-        raise RuntimeError("Location element not loaded.")
-    try:
-        people = await get_people(loc)
-    except RuntimeError:
-        people = []
+    if not (
+        extracted := await loc.page.evaluate(
+            ITEM_METADATA,
+            {"timeout": ITEM_METADATA_TIMEOUT, "peopleTimeout": PEOPLE_TIMEOUT},
+        )
+    ):
+        raise RuntimeError("Albums or location element not loaded.")
+    metadata = MediaItemMetadata(**extracted)
     item.item = loc.page.url
-    item.people = people
-    item.albums = albums
-    item.details = details
-    item.position = position
-
-
-@quick_retry(RuntimeError, TimeoutError)
-async def get_people(loc):
-    people = await loc_people(loc).all_inner_texts()
-    if not people:
-        raise RuntimeError("People element not loaded or people not found.")
-    return people
+    item.people = metadata.people
+    item.albums = metadata.albums
+    item.details = metadata.details
+    item.position = metadata.position
 
 
 async def get_image_preview_source(loc: Locator):
-    return await loc_image_preview_source(loc).get_attribute("src")
+    return await loc_image_preview_source(loc).first.get_attribute("src")
 
 
 async def get_item_count(loc: Locator) -> int:
@@ -239,7 +335,7 @@ async def get_media_item_source(loc: Locator, details: list[str]) -> str:
     if not await loc_photo(loc).is_visible() and "(0 B)" in "".join(details):
         return ""
     async with loc.page.expect_download() as downloader:
-        await loc.press("Shift+D")
+        await loc.page.keyboard.press("Shift+D")
     download = await downloader.value
     await download.cancel()
     return download.url
@@ -250,7 +346,7 @@ def loc_albums_containing_item(loc: Locator) -> Locator:
 
 
 def loc_album_media_items(loc: Locator) -> Locator:
-    return loc_main(loc).get_by_role("link", name=compile(r"^(?!Back|Goog|Play).*$"))
+    return loc_main(loc).locator("a[href*='/photo/']")
 
 
 def loc_details(loc: Locator):
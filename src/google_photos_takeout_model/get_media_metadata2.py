@@ -1,21 +1,35 @@
-from asyncio import Lock, Task, TaskGroup, run
-from contextlib import asynccontextmanager
+from asyncio import Lock, Task, TaskGroup, run, to_thread
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, asynccontextmanager, suppress
+from dataclasses import dataclass, field
 from itertools import cycle
+from multiprocessing import Manager, get_context
+from pathlib import Path
+from queue import Empty, Queue
 from sys import argv
-from typing import Any
+from time import perf_counter
+from typing import Any, Literal
 
-from playwright.async_api import Locator, TimeoutError  # noqa: A004
+from playwright.async_api import BrowserContext, Locator
 from tqdm.asyncio import tqdm
 
+from google_photos_takeout_model import Checkpoint
 from google_photos_takeout_model.get_media_metadata import (
+    Album,
     MediaItemMetadata,
+    MediaItemNotFoundError,
     add_progress_callbacks,
     albums,
+    file_album,
+    get_album,
+    get_album_id_path,
+    goto_media_item,
     login_and_reveal_info,
-    slow_retry,
     update_media_item_metadata,
+    write_album,
 )
-from google_photos_takeout_model.pw import context
+from google_photos_takeout_model.pw import context, locator_pool
+from google_photos_takeout_model.work_queue import Work, WorkQueue
 
 type Batch = tuple[int, tuple[MediaItemMetadata, ...]]
 
@@ -23,28 +37,61 @@ type Batch = tuple[int, tuple[MediaItemMetadata, ...]]
 ALBUM_URLS = argv[1:]
 PAGES = 24
 OVERWRITE = False
+QUEUED = False
+"""Scrape items from the persistent work queue, seeding it from albums when empty."""
+SHARDS = 1
+"""Worker processes to split albums across, each with its own browser."""
+WRITE_INTERVAL = 30.0
+"""Seconds between writes of album files changed by sharded scraping."""
+COMMIT_INTERVAL = 50
+"""Items finished from the work queue between writing their albums and committing."""
+
+type Message = (
+    tuple[Literal["album"], str, Path, dict[str, Any]]
+    | tuple[Literal["total"], int]
+    | tuple[Literal["item"], str, int, dict[str, Any]]
+    | tuple[Literal["skip"]]
+)
+"""Results sent by shards to the single writer, with albums keyed by URL."""
 
 
 async def main(
-    urls: list[str] = ALBUM_URLS, pages: int = PAGES, overwrite: bool = OVERWRITE
+    urls: list[str] = ALBUM_URLS,
+    pages: int = PAGES,
+    overwrite: bool = OVERWRITE,
+    shards: int = SHARDS,
+):
+    await login_and_reveal_info()
+    if shards > 1:
+        return scrape_sharded(urls, shards, pages, overwrite)
+    async with context() as ctx:
+        await scrape(ctx, urls, pages, overwrite)
+
+
+async def scrape(
+    ctx: BrowserContext,
+    urls: list[str] = ALBUM_URLS,
+    pages: int = PAGES,
+    overwrite: bool = OVERWRITE,
 ):
-    async with tasks(urls, pages, overwrite) as (tg, ts, loop, items):
+    async with tasks(ctx, urls, pages, overwrite) as (tg, ts, loop, items):
         for idx, ((loc, lock), _item) in loop:
             ts.append(tg.create_task(process_item(loc, lock, items, idx)))
 
 
 @asynccontextmanager
 async def tasks(
-    urls: list[str] = ALBUM_URLS, pages: int = PAGES, overwrite: bool = OVERWRITE
+    ctx: BrowserContext,
+    urls: list[str] = ALBUM_URLS,
+    pages: int = PAGES,
+    overwrite: bool = OVERWRITE,
 ):
     progress = tqdm(smoothing=0, total=0)
-    await login_and_reveal_info()
-    async with context() as ctx, TaskGroup() as tg:
-        items: list[MediaItemMetadata] = []
-        locators = [((await ctx.new_page()).locator("*"), Lock()) for _ in range(pages)]
+    items: list[MediaItemMetadata] = []
+    async with locator_pool(ctx, pages) as locators:
         locs = cycle(locators)
         async with albums(locs, progress, urls) as albs:
-            for alb in albs:
+            for alb, _ in albs:
                 meta = alb.media_items_metadata
                 if overwrite:
                     items.extend(meta)
@@ -56,8 +103,6 @@ async def tasks(
             async with TaskGroup() as tg:
                 yield tg, ts, loop, items
                 add_progress_callbacks(progress, ts)
-            for loc, _ in locators:
-                await loc.page.close()
     progress.close()
 
 
@@ -68,9 +113,234 @@ async def process_item(
     if not item.item:
         return
     async with lock:
-        await slow_retry(TimeoutError)(loc.page.goto)(item.item)
+        try:
+            await goto_media_item(loc, item.item)
+        except MediaItemNotFoundError:
+            return
         await update_media_item_metadata(loc, media_items_metadata[idx])
 
 
+def scrape_sharded(
+    urls: list[str] = ALBUM_URLS,
+    shards: int = SHARDS,
+    pages: int = PAGES,
+    overwrite: bool = OVERWRITE,
+):
+    """Scrape albums split across worker processes, writing results from this one.
+
+    One event loop and Playwright driver saturate well below the cores available, so
+    each shard runs its own, logged in from the shared storage state. Albums belong to
+    one shard, so shards send results here instead of writing album files themselves.
+    """
+    albs: dict[Path, Album] = {}
+    paths: dict[str, Path] = {}
+    changed: set[Path] = set()
+    progress = tqdm(smoothing=0, total=0)
+    written = perf_counter()
+    with (
+        Manager() as manager,
+        ProcessPoolExecutor(shards, mp_context=get_context("spawn")) as executor,
+    ):
+        results: Queue[Message] = manager.Queue()
+        futures = [
+            executor.submit(scrape_shard, shard, pages, overwrite, results)
+            for i in range(shards)
+            if (shard := urls[i::shards])
+        ]
+        try:
+            while not all(f.done() for f in futures) or not results.empty():
+                with suppress(Empty):
+                    changed |= handle_message(
+                        albs, paths, progress, results.get(timeout=1)
+                    )
+                if perf_counter() - written > WRITE_INTERVAL:
+                    write_albums(albs, changed)
+                    written = perf_counter()
+            for future in futures:
+                future.result()
+        finally:
+            write_albums(albs, changed)
+            progress.close()
+
+
+def handle_message(
+    albs: dict[Path, Album], paths: dict[str, Path], progress: tqdm, message: Message
+) -> set[Path]:
+    """Apply a shard's result, returning the album file it changed, if any.
+
+    Albums sharing a title in this run get files named by their IDs as well.
+    """
+    match message:
+        case ("album", url, path, alb):
+            if path in albs and albs[path].item != url:
+                path = get_album_id_path(albs[path].title, url)
+            paths[url] = path
+            albs[path] = Album(**alb)
+            return {path}
+        case ("total", count):
+            progress.total += count
+            progress.refresh()
+        case ("item", url, idx, item):
+            albs[path := paths[url]].media_items_metadata[idx] = MediaItemMetadata(
+                **item
+            )
+            progress.update()
+            return {path}
+        case ("skip",):
+            progress.update()
+    return set()
+
+
+def write_albums(albs: dict[Path, Album], changed: set[Path]):
+    for path in changed:
+        write_album(path, albs[path])
+    changed.clear()
+
+
+def scrape_shard(urls: list[str], pages: int, overwrite: bool, results: Queue[Message]):
+    run(scrape_shard_albums(urls, pages, overwrite, results))
+
+
+async def scrape_shard_albums(
+    urls: list[str], pages: int, overwrite: bool, results: Queue[Message]
+):
+    async with context() as ctx, locator_pool(ctx, pages) as locators:
+        locs = cycle(locators)
+        async with TaskGroup() as tg:
+            tasks = [
+                tg.create_task(get_album(loc, lock, url))
+                for url, (loc, lock) in zip(urls, locs, strict=False)
+            ]
+        items: list[tuple[str, int, MediaItemMetadata]] = []
+        for url, task in zip(urls, tasks, strict=True):
+            alb, path = task.result()
+            # ? Manager queues block on their server process, so put from a thread
+            await to_thread(results.put, ("album", url, path, alb.model_dump()))
+            items.extend(
+                (url, idx, item)
+                for idx, item in enumerate(alb.media_items_metadata)
+                if item.item and (overwrite or not item.details)
+            )
+        await to_thread(results.put, ("total", len(items)))
+        async with TaskGroup() as tg:
+            for (url, idx, item), (loc, lock) in zip(items, locs, strict=False):
+                tg.create_task(scrape_shard_item(loc, lock, results, url, idx, item))
+
+
+async def scrape_shard_item(
+    loc: Locator,
+    lock: Lock,
+    results: Queue[Message],
+    url: str,
+    idx: int,
+    item: MediaItemMetadata,
+):
+    async with lock:
+        try:
+            await goto_media_item(loc, item.item)
+        except MediaItemNotFoundError:
+            return await to_thread(results.put, ("skip",))
+        await update_media_item_metadata(loc, item)
+    await to_thread(results.put, ("item", url, idx, item.model_dump()))
+
+
+async def queued(
+    urls: list[str] = ALBUM_URLS, pages: int = PAGES, overwrite: bool = OVERWRITE
+):
+    await login_and_reveal_info()
+    async with context() as ctx:
+        await scrape_queued(ctx, urls, pages, overwrite)
+
+
+async def scrape_queued(
+    ctx: BrowserContext,
+    urls: list[str] = ALBUM_URLS,
+    pages: int = PAGES,
+    overwrite: bool = OVERWRITE,
+):
+    """Scrape pending items from the work queue without re-opening their albums."""
+    with WorkQueue.connect() as queue:
+        if overwrite or not queue.pending():
+            await seed(ctx, queue, urls, pages, overwrite)
+        work = queue.pending()
+        progress = tqdm(smoothing=0, total=len(work))
+        with ExitStack() as stack:
+            albs = {
+                path: stack.enter_context(file_album(path))
+                for path in {w.album for w in work}
+            }
+            async with (
+                locator_pool(ctx, min(pages, len(work))) as locators,
+                TaskGroup() as tg,
+            ):
+                checkpoint = QueueCheckpoint(queue, albs, interval=COMMIT_INTERVAL)
+                ts = [
+                    tg.create_task(process_work(loc, lock, checkpoint, w))
+                    for w, (loc, lock) in zip(work, cycle(locators), strict=False)
+                ]
+                add_progress_callbacks(progress, ts)
+        progress.close()
+        tqdm.write(
+            f"{queue.count('done')} done, {queue.count('pending')} pending, "
+            f"{queue.count('dead')} dead"
+        )
+
+
+async def seed(
+    ctx: BrowserContext, queue: WorkQueue, urls: list[str], pages: int, overwrite: bool
+):
+    """Queue items from albums that are incomplete, or all items again if overwriting."""
+    progress = tqdm(smoothing=0, total=0)
+    async with (
+        locator_pool(ctx, pages) as locators,
+        albums(cycle(locators), progress, urls) as albs,
+    ):
+        for alb, path in albs:
+            for idx, item in enumerate(alb.media_items_metadata):
+                if not item.item:
+                    continue
+                work = Work(path, idx, item.item)
+                if overwrite:
+                    queue.requeue(work)
+                elif not item.details:
+                    queue.put(work)
+    progress.close()
+
+
+@dataclass
+class QueueCheckpoint(Checkpoint):
+    """Write changed albums and commit the queue, leaving later items pending in it."""
+
+    queue: WorkQueue
+    albs: dict[Path, Album]
+    changed: set[Path] = field(default_factory=set)
+
+    def finish(self, work: Work):
+        self.changed.add(work.album)
+        self.step()
+
+    def save(self):
+        write_albums(self.albs, self.changed)
+        self.queue.commit()
+
+
+async def process_work(
+    loc: Locator, lock: Lock, checkpoint: QueueCheckpoint, work: Work
+):
+    queue = checkpoint.queue
+    item = checkpoint.albs[work.album].media_items_metadata[work.idx]
+    async with lock:
+        try:
+            await goto_media_item(loc, work.item)
+            await update_media_item_metadata(loc, item)
+        except MediaItemNotFoundError as err:
+            queue.dead(work, str(err))
+        except Exception as err:  # noqa: BLE001
+            queue.fail(work, repr(err))
+        else:
+            queue.done(work)
+    checkpoint.finish(work)
+
+
 if __name__ == "__main__":
-    run(main())
+    run(queued() if QUEUED else main())
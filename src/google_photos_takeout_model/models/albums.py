@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 from json import loads
-from pathlib import Path
+from os import scandir
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING
 
 from pydantic import Field
 
 from google_photos_takeout_model.models.bases import GeoData, Time, ToCamelBaseModel
-from google_photos_takeout_model.models.media_items import MediaItem, get_media_items
+from google_photos_takeout_model.models.media_items import (
+    Entries,
+    MediaItem,
+    get_entries,
+    get_media_items,
+    local_read_text,
+)
+
+if TYPE_CHECKING:
+    from google_photos_takeout_model.models.archives import Archive
 
 ALBUM_METADATA = "metadata.json"
 
@@ -15,6 +26,8 @@ class Album(ToCamelBaseModel):
     path: Path
     metadata_path: Path
     media_items: list[MediaItem] = Field(default_factory=list)
+    orphaned_media: list[Path] = Field(default_factory=list)
+    orphaned_sidecars: list[Path] = Field(default_factory=list)
 
     title: str
     description: str
@@ -24,12 +37,40 @@ class Album(ToCamelBaseModel):
     geo_data: GeoData
 
     @classmethod
-    def from_path(cls, path: Path) -> Album:
+    def from_path(
+        cls,
+        path: PurePath,
+        archive: Archive | None = None,
+        entries: Entries | None = None,
+    ) -> Album:
+        entries = entries or get_entries(path, archive)
+        metadata_path = entries.album_metadata or path / ALBUM_METADATA
         return cls.model_validate(
             obj={
-                "path": path,
-                "metadata_path": path / ALBUM_METADATA,
-                "media_items": get_media_items(path),
-                **loads((path / ALBUM_METADATA).read_text(encoding="utf-8")),
+                "path": Path(path),
+                "metadata_path": Path(metadata_path),
+                "media_items": get_media_items(path, archive, entries),
+                "orphaned_media": [Path(p) for p in entries.orphaned_media],
+                "orphaned_sidecars": [Path(p) for p in entries.orphaned_sidecars],
+                **loads(
+                    (archive.read_text if archive else local_read_text)(metadata_path)
+                ),
             }
         )
+
+
+def get_albums(path: PurePath, archive: Archive | None = None) -> list[Album]:
+    """Get albums in a takeout directory, or in that directory of archive parts.
+
+    Each directory is listed once, both to find its album metadata and its media.
+    """
+    if archive:
+        directories = [p for p in archive.iterdir(path) if archive.is_dir(p)]
+    else:
+        with scandir(path) as listing:
+            directories = [Path(e.path) for e in listing if e.is_dir()]
+    return [
+        Album.from_path(directory, archive, entries)
+        for directory in directories
+        if (entries := get_entries(directory, archive)).album_metadata
+    ]
@@ -0,0 +1,145 @@
+"""Takeout archive parts read in place, without extracting them."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath, PurePosixPath
+from tarfile import open as open_tar
+from typing import Self
+from zipfile import ZipFile, is_zipfile
+
+TAKEOUT_ROOT = PurePosixPath("Takeout/Google Photos")
+"""Directory of albums in each archive part."""
+WORKERS = 8
+CACHED_SUFFIX = ".json"
+"""Members kept in memory while streaming tar parts, which can't be read randomly."""
+COMPRESSED = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+"""Magic numbers of gzip, bzip2 and xz, which compressed tar parts start with."""
+
+
+@dataclass
+class Member:
+    part: Path
+    name: str
+    size: int
+    data: bytes | None = None
+    """Contents, cached for members of tar parts."""
+    offset: int | None = None
+    """Offset of the contents in uncompressed tar parts, which can be read randomly."""
+
+
+@dataclass
+class Archive:
+    """Index of members across takeout archive parts.
+
+    Zip parts are indexed from their central directories and read randomly. Tar parts,
+    compressed or not, are streamed once, caching sidecars and album metadata so that
+    the models can be loaded without decompressing the parts again. Other members of
+    uncompressed tar parts are read at the offsets recorded while indexing.
+    """
+
+    members: dict[PurePosixPath, Member] = field(default_factory=dict)
+    children: defaultdict[PurePosixPath, set[PurePosixPath]] = field(
+        default_factory=lambda: defaultdict(set)
+    )
+    zips: dict[Path, ZipFile] = field(default_factory=dict)
+
+    @classmethod
+    def from_paths(cls, parts: Iterable[Path], workers: int = WORKERS) -> Self:
+        """Index archive parts concurrently."""
+        archive = cls()
+        with ThreadPoolExecutor(workers) as executor:
+            for part, zip_part, members in executor.map(index_part, parts):
+                if zip_part:
+                    archive.zips[part] = zip_part
+                for member in members:
+                    archive.add(member)
+        return archive
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_):
+        for part in self.zips.values():
+            part.close()
+
+    def add(self, member: Member):
+        path = PurePosixPath(member.name)
+        self.members[path] = member
+        for parent in path.parents:
+            if path in self.children[parent]:
+                break
+            self.children[parent].add(path)
+            path = parent
+
+    def exists(self, path: PurePath) -> bool:
+        return (path := posix(path)) in self.members or path in self.children
+
+    def is_file(self, path: PurePath) -> bool:
+        return posix(path) in self.members
+
+    def is_dir(self, path: PurePath) -> bool:
+        return posix(path) in self.children
+
+    def iterdir(self, path: PurePath) -> list[PurePosixPath]:
+        return sorted(self.children.get(posix(path), ()))
+
+    def read_bytes(self, path: PurePath) -> bytes:
+        member = self.members[posix(path)]
+        if member.data is not None:
+            return member.data
+        if zip_part := self.zips.get(member.part):
+            return zip_part.read(member.name)
+        if member.offset is not None:
+            with member.part.open("rb") as part:
+                part.seek(member.offset)
+                return part.read(member.size)
+        # ? Uncached members of compressed tar parts need the part streamed again
+        with open_tar(member.part, "r|*") as tar:
+            for info in tar:
+                if info.name == member.name and (file := tar.extractfile(info)):
+                    return file.read()
+        raise FileNotFoundError(path)
+
+    def read_text(self, path: PurePath) -> str:
+        return self.read_bytes(path).decode("utf-8")
+
+
+def index_part(part: Path) -> tuple[Path, ZipFile | None, list[Member]]:
+    """Index a part, keeping zip parts open for random access."""
+    if is_zipfile(part):
+        zip_part = ZipFile(part)
+        return (
+            part,
+            zip_part,
+            [
+                Member(part, info.filename, info.file_size)
+                for info in zip_part.infolist()
+                if not info.is_dir()
+            ],
+        )
+    members: list[Member] = []
+    with part.open("rb") as file:
+        compressed = file.read(6).startswith(COMPRESSED)
+    with open_tar(part, "r|*") as tar:
+        for info in tar:
+            if not info.isfile():
+                continue
+            member = Member(
+                part,
+                info.name,
+                info.size,
+                offset=None if compressed else info.offset_data,
+            )
+            if info.name.endswith(CACHED_SUFFIX) and (file := tar.extractfile(info)):
+                member.data = file.read()
+            members.append(member)
+    return part, None, members
+
+
+def posix(path: PurePath) -> PurePosixPath:
+    """Get a member path, even from a Windows path."""
+    return PurePosixPath(path.as_posix())
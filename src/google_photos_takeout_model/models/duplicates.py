@@ -0,0 +1,232 @@
+"""Near-duplicate images found by perceptual hashes, across edits and re-uploads."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, field
+from itertools import combinations
+from json import dumps, loads
+from os import cpu_count
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pydantic import Field
+from tqdm import tqdm
+
+from google_photos_takeout_model.models.bases import ToCamelBaseModel
+from google_photos_takeout_model.models.library import TAKEOUT, get_library, get_stat
+from google_photos_takeout_model.models.media_items import MediaItem
+
+with suppress(ImportError):
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+
+HASHES = Path("perceptual-hashes.json")
+"""Perceptual hashes keyed by path, with the size and modification time hashed."""
+HASH_SIZE = 8
+"""Rows and columns of gradients compared, giving hashes of this many squared bits."""
+DISTANCE = 6
+"""Most bits that may differ between hashes of near-duplicates."""
+CHUNKS = 4
+"""Chunks of each hash indexed, trading lookups per search for candidates compared."""
+WORKERS = cpu_count() or 1
+IMAGES = (".jpg", ".jpeg", ".heic", ".heif", ".png", ".webp", ".gif", ".tif", ".tiff")
+
+
+class DuplicateGroup(ToCamelBaseModel):
+    media_items: list[MediaItem] = Field(default_factory=list)
+
+    @property
+    def origins(self) -> list[str]:
+        """Kind of each item's origin, such as `PartnerSharing` or `SharedAlbum`."""
+        return [get_origin(item) for item in self.media_items]
+
+
+@dataclass
+class Hashes:
+    path: Path
+    contents: dict[str, tuple[int, int, int]]
+    """Size, modification time and hash, keyed by POSIX path."""
+
+    @classmethod
+    def from_path(cls, path: Path) -> Self:
+        if not path.exists():
+            path.write_text(encoding="utf-8", data="{}")
+        return cls(
+            path,
+            {
+                key: (size, mtime, phash)
+                for key, [size, mtime, phash] in loads(
+                    path.read_text(encoding="utf-8")
+                ).items()
+            },
+        )
+
+    def write(self):
+        self.path.write_text(
+            encoding="utf-8", data=f"{dumps(self.contents, indent=2)}\n"
+        )
+
+
+@dataclass
+class MultiIndex:
+    """Hashes indexed by each of their chunks, searched without comparing most pairs.
+
+    Hashes within the radius of each other differ in some chunk by at most the radius
+    divided by the number of chunks, so only hashes sharing a chunk within that smaller
+    radius are compared in full.
+    """
+
+    radius: int = DISTANCE
+    chunks: int = CHUNKS
+    bits: int = HASH_SIZE**2
+    hashes: dict[int, int] = field(default_factory=dict)
+    tables: list[defaultdict[int, list[int]]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.tables = [defaultdict(list) for _ in range(self.chunks)]
+
+    def add(self, phash: int, idx: int):
+        self.hashes[idx] = phash
+        for table, chunk in zip(self.tables, self.split(phash), strict=True):
+            table[chunk].append(idx)
+
+    def search(self, phash: int) -> set[int]:
+        """Get items whose hashes are within the radius of a hash."""
+        width = self.bits // self.chunks
+        flips = [
+            sum(1 << bit for bit in bits)
+            for count in range(self.radius // self.chunks + 1)
+            for bits in combinations(range(width), count)
+        ]
+        return {
+            idx
+            for table, chunk in zip(self.tables, self.split(phash), strict=True)
+            for flip in flips
+            for idx in table.get(chunk ^ flip, ())
+            if (self.hashes[idx] ^ phash).bit_count() <= self.radius
+        }
+
+    def split(self, phash: int) -> list[int]:
+        width = self.bits // self.chunks
+        return [(phash >> (width * i)) & ((1 << width) - 1) for i in range(self.chunks)]
+
+
+def main(takeout: Path = TAKEOUT):
+    for group in get_duplicate_groups(get_library(takeout)):
+        tqdm.write(
+            "\n".join(
+                f"{origin}: {item.path.as_posix()}"
+                for item, origin in zip(group.media_items, group.origins, strict=True)
+            )
+            + "\n"
+        )
+
+
+def get_duplicate_groups(
+    media_items: list[MediaItem],
+    distance: int = DISTANCE,
+    hashes: Path = HASHES,
+    workers: int = WORKERS,
+) -> list[DuplicateGroup]:
+    """Group media items whose images look alike, even if their bytes differ."""
+    images = [item for item in media_items if item.path.suffix.casefold() in IMAGES]
+    phashes = get_hashes([item.path for item in images], hashes, workers)
+    index = MultiIndex(distance)
+    for idx, phash in enumerate(phashes):
+        if phash is not None:
+            index.add(phash, idx)
+    # ? Union near-duplicates, so chains of small differences end up in one group
+    parents = list(range(len(images)))
+    for idx, phash in enumerate(phashes):
+        if phash is None:
+            continue
+        for other in index.search(phash):
+            parents[find(parents, other)] = find(parents, idx)
+    groups: defaultdict[int, list[MediaItem]] = defaultdict(list)
+    for idx, item in enumerate(images):
+        if phashes[idx] is not None:
+            groups[find(parents, idx)].append(item)
+    return [
+        DuplicateGroup(media_items=group) for group in groups.values() if len(group) > 1
+    ]
+
+
+def find(parents: list[int], idx: int) -> int:
+    while parents[idx] != idx:
+        parents[idx] = idx = parents[parents[idx]]
+    return idx
+
+
+def get_hashes(
+    paths: list[Path], hashes: Path = HASHES, workers: int = WORKERS
+) -> list[int | None]:
+    """Get perceptual hashes, computing only those not cached on a process pool.
+
+    Cached hashes are reused while the size and modification time of a file are the
+    same. Images that can't be decoded have no hash.
+    """
+    cache = Hashes.from_path(hashes)
+    stats = [(path.as_posix(), *get_stat(path)) for path in paths]
+    stale = [
+        (key, size, mtime)
+        for key, size, mtime in stats
+        if (cached := cache.contents.get(key)) is None or cached[:2] != (size, mtime)
+    ]
+    with (
+        ProcessPoolExecutor(workers) as executor,
+        tqdm(total=len(stale), unit="image", smoothing=0) as progress,
+    ):
+        for (key, size, mtime), phash in zip(
+            stale,
+            executor.map(get_hash, (key for key, *_ in stale), chunksize=64),
+            strict=True,
+        ):
+            progress.update()
+            if phash is None:
+                cache.contents.pop(key, None)
+            else:
+                cache.contents[key] = (size, mtime, phash)
+    cache.write()
+    return [
+        cached[2] if (cached := cache.contents.get(key)) else None for key, *_ in stats
+    ]
+
+
+def get_hash(path: str, size: int = HASH_SIZE) -> int | None:
+    """Get the difference hash of an image, comparing brightness of neighboring pixels.
+
+    JPEGs are decoded at a reduced scale, which is much faster than a full decode and
+    loses nothing at the size hashed. Images are turned upright first, so that rotation
+    by Exif orientation alone doesn't hide duplicates.
+    """
+    try:
+        with Image.open(path) as image:
+            image.draft("L", (size * 8, size * 8))
+            pixels = np.asarray(
+                ImageOps.exif_transpose(image)
+                .convert("L")
+                .resize((size + 1, size), Image.Resampling.BOX),
+                dtype=np.int16,
+            )
+    except (OSError, UnidentifiedImageError, ValueError):
+        return None
+    phash = 0
+    for brighter in (pixels[:, :-1] > pixels[:, 1:]).flat:
+        phash = phash << 1 | int(brighter)
+    return phash
+
+
+def get_origin(media_item: MediaItem) -> str:
+    if not (origin := media_item.google_photos_origin):
+        return "Unknown"
+    return type(origin).__name__.removeprefix("GooglePhotos").removesuffix("Origin")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Events clustered from media item timelines, proposed as dated albums."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime
+from itertools import count, pairwise
+from os import link
+from pathlib import Path
+from shutil import copy2
+
+import numpy as np
+from pydantic import Field
+from tqdm import tqdm
+
+from google_photos_takeout_model.models.bases import ToCamelBaseModel
+from google_photos_takeout_model.models.library import (
+    EARTH_RADIUS,
+    TAKEOUT,
+    get_coordinates,
+    get_library,
+)
+from google_photos_takeout_model.models.media_items import MediaItem
+
+PROPOSED = "proposed"
+GAP = 8 * 60 * 60
+"""Seconds between consecutive items that splits events."""
+DISTANCE = 100.0
+"""Kilometers between consecutive located items that splits events."""
+MIN_ITEMS = 5
+"""Fewest items in an event proposed as an album."""
+DASH = "\N{EN DASH}"
+"""Separates the start and end dates in album names."""
+
+
+class Event(ToCamelBaseModel):
+    start: datetime
+    end: datetime
+    media_items: list[MediaItem] = Field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        """Name like the curated dated albums, such as `2008-(11-27) - (12-17)` with an en dash."""
+        start = f"{self.start:%Y}-({self.start:%m-%d})"
+        if self.start.date() == self.end.date():
+            return start
+        if self.start.year == self.end.year:
+            return f"{start} {DASH} ({self.end:%m-%d})"
+        return f"{start} {DASH} {self.end:%Y}-({self.end:%m-%d})"
+
+
+def main(takeout: Path = TAKEOUT):
+    media_items = get_library(takeout)
+    events = cluster(media_items)
+    tqdm.write(f"Proposed {len(events)} events from {len(media_items)} media items.")
+    propose(events, takeout / PROPOSED)
+
+
+def cluster(
+    media_items: list[MediaItem],
+    gap: float = GAP,
+    distance: float = DISTANCE,
+    min_items: int = MIN_ITEMS,
+) -> list[Event]:
+    """Cluster media items into events, splitting the timeline at gaps in time or space.
+
+    Items are sorted by when they were taken, and every gap is found in one vectorized
+    pass. Distances are measured from each located item to the last located item before
+    it, since many items have no location.
+    """
+    if not media_items:
+        return []
+    times = np.fromiter(
+        (int(item.photo_taken_time.timestamp) for item in media_items),
+        dtype=np.int64,
+        count=len(media_items),
+    )
+    coords = get_coordinates(media_items)
+    order = np.argsort(times, kind="stable")
+    times, coords = times[order], np.radians(coords[order])
+    splits = get_splits(times, coords, gap, distance)
+    return [
+        Event(
+            # ? Name events by local dates, as they were lived
+            start=datetime.fromtimestamp(int(times[first])).astimezone(),
+            end=datetime.fromtimestamp(int(times[last - 1])).astimezone(),
+            media_items=[media_items[idx] for idx in order[first:last]],
+        )
+        for first, last in pairwise(splits)
+        if last - first >= min_items
+    ]
+
+
+def get_splits(
+    times: np.ndarray, coords: np.ndarray, gap: float, distance: float
+) -> np.ndarray:
+    """Get the bounds of events in sorted items, including the start and end."""
+    count = len(times)
+    breaks = np.zeros(count, dtype=bool)
+    breaks[1:] = np.diff(times) > gap
+    located = coords.any(axis=1)
+    # ? Index of the last located item at or before each item, or -1 if none
+    last_located = np.maximum.accumulate(np.where(located, np.arange(count), -1))
+    previous = np.empty(count, dtype=np.int64)
+    previous[0], previous[1:] = -1, last_located[:-1]
+    moved = np.flatnonzero(located & (previous >= 0))
+    breaks[moved] |= haversine(coords[moved], coords[previous[moved]]) > distance
+    return np.concatenate(([0], np.flatnonzero(breaks), [count]))
+
+
+def haversine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Great-circle distances in kilometers between rows of coordinates in radians."""
+    (lat_a, lon_a), (lat_b, lon_b) = a.T, b.T
+    h = (
+        np.sin((lat_b - lat_a) / 2) ** 2
+        + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def propose(events: Iterable[Event], root: Path):
+    """Link media items and their sidecars into a dated folder for each event.
+
+    Items with the same name get numbered, with their sidecars named to match.
+    """
+    for event in tqdm(events, unit="event"):
+        album = root / event.name
+        num = 1
+        while album.exists():
+            num += 1
+            album = root / f"{event.name} ({num})"
+        album.mkdir(parents=True)
+        for item in event.media_items:
+            path = get_free_path(album / item.path.name)
+            link_or_copy(item.path, path)
+            link_or_copy(item.metadata_path, path.with_name(f"{path.name}.json"))
+
+
+def get_free_path(path: Path) -> Path:
+    """Get a path that isn't taken, numbering the stem like the takeout does."""
+    if not path.exists():
+        return path
+    return next(
+        numbered
+        for num in count(1)
+        if not (numbered := path.with_stem(f"{path.stem}({num})")).exists()
+    )
+
+
+def link_or_copy(src: Path, dst: Path):
+    """Hard link a file, copying it only where links aren't supported."""
+    try:
+        link(src, dst)
+    except OSError:
+        copy2(src, dst)
+
+
+if __name__ == "__main__":
+    main()
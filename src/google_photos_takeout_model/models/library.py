@@ -0,0 +1,46 @@
+"""Media items across the year directories of a takeout, for the offline models."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from sys import argv
+
+import numpy as np
+
+from google_photos_takeout_model.models.media_items import MediaItem, get_media_items
+
+TAKEOUT = Path(argv[1]) if argv[1:] else Path("takeout")
+YEARS = "years"
+EARTH_RADIUS = 6371.0
+"""Mean radius of the Earth in kilometers."""
+
+
+def get_library(takeout: Path = TAKEOUT) -> list[MediaItem]:
+    """Get media items of every year of a takeout, in order of years."""
+    return [
+        item
+        for year in sorted((takeout / YEARS).iterdir())
+        for item in get_media_items(year)
+    ]
+
+
+def get_coordinates(media_items: list[MediaItem]) -> np.ndarray:
+    """Get latitude and longitude of media items, from Exif if not set in Google Photos."""
+    return np.array(
+        [
+            (geo.latitude, geo.longitude)
+            for geo in (
+                item.geo_data
+                if item.geo_data.latitude or item.geo_data.longitude
+                else item.geo_data_exif
+                for item in media_items
+            )
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+
+
+def get_stat(path: Path) -> tuple[int, int]:
+    """Get the size and modification time of a file, which change when it does."""
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
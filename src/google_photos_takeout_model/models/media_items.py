@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
 from json import loads
-from pathlib import Path
-from re import match
+from os import scandir
+from pathlib import Path, PurePath
+from re import fullmatch, match
+from typing import TYPE_CHECKING, Any
 from typing import Annotated as Ann
-from typing import Any
 
 from pydantic import BaseModel, Discriminator, Field, Tag
 from pydantic.alias_generators import to_snake
@@ -18,7 +21,10 @@ from google_photos_takeout_model.models.google_photos_origins import (
     GooglePhotosWebOrigin,
 )
 
-MEDIA_ITEM_GLOB = "[!metadata]*[!.json]"
+if TYPE_CHECKING:
+    from google_photos_takeout_model.models.archives import Archive
+
+ALBUM_METADATA_NAME = r"metadata(\(\d+\))?\.json"
 PARENTHESIZED_MEDIA_ITEM_STEM = r"(?P<name>^.*[^\s])\((?P<num>\d+)\)$"
 NAME_MAX_LENGTH = 51
 JSON = ".json"
@@ -82,50 +88,124 @@ class MediaItem(ToCamelBaseModel):
     ) = None
 
     @classmethod
-    def from_path(cls, path: Path) -> MediaItem:
-        # sourcery skip: merge-else-if-into-elif, remove-pass-elif
-        if (metadata_path := path.with_name(f"{path.name}.json")).exists():
-            pass
-        elif (metadata_path := path.with_name(f"{path.name}.jloc.page.json")).exists():
-            pass
-        elif (metadata_path := path.with_name(f"{path.stem}.json")).exists():
-            pass
-        elif (metadata_path := path.with_name(f"{path.stem}.jloc.page.json")).exists():
-            pass
-        else:
-            if path.stem.endswith("-edited"):
-                metadata_path = path.with_name(
-                    f"{path.stem.removesuffix('-edited')}{path.suffix}.json"
-                )
-            elif len(path.name) > JSON_STEM_MAX_LENGTH:
-                metadata_path = path.with_name(
-                    f"{path.name[:JSON_STEM_MAX_LENGTH]}{JSON}"
-                )
-            elif stem := match(PARENTHESIZED_MEDIA_ITEM_STEM, path.stem):
-                if (
-                    metadata_path := path.with_name(
-                        f"{stem['name']}{path.suffix}({stem['num']}).json"
-                    )
-                ).exists():
-                    pass
-                elif (
-                    metadata_path := path.with_name(
-                        f"{stem['name']}{path.suffix}.jpg({stem['num']}).json"
-                    )
-                ).exists():
-                    pass
-            else:
-                raise ValueError(f"Can't get metadata path from {path}.")
-            if not metadata_path.exists():
-                raise ValueError(f"Metadata file for {path} does not exist.")
+    def from_path(
+        cls,
+        path: PurePath,
+        archive: Archive | None = None,
+        metadata_path: PurePath | None = None,
+    ) -> MediaItem:
+        metadata_path = metadata_path or get_metadata_path(
+            path, archive.exists if archive else local_exists
+        )
         return cls.model_validate(
             obj={
-                "path": path,
-                "metadata_path": metadata_path,
-                **loads(metadata_path.read_text(encoding="utf-8")),
+                "path": Path(path),
+                "metadata_path": Path(metadata_path),
+                **loads(
+                    (archive.read_text if archive else local_read_text)(metadata_path)
+                ),
             }
         )
 
 
-def get_media_items(path: Path) -> list[MediaItem]:
-    return [MediaItem.from_path(path) for path in path.glob(MEDIA_ITEM_GLOB)]
+def get_metadata_path(path: PurePath, exists: Callable[[PurePath], bool]) -> PurePath:
+    """Get the sidecar metadata path of a media item, given a way to check paths."""
+    # sourcery skip: merge-else-if-into-elif, remove-pass-elif
+    if exists(metadata_path := path.with_name(f"{path.name}.json")):
+        pass
+    elif exists(metadata_path := path.with_name(f"{path.name}.jloc.page.json")):
+        pass
+    elif exists(metadata_path := path.with_name(f"{path.stem}.json")):
+        pass
+    elif exists(metadata_path := path.with_name(f"{path.stem}.jloc.page.json")):
+        pass
+    else:
+        if path.stem.endswith("-edited"):
+            metadata_path = path.with_name(
+                f"{path.stem.removesuffix('-edited')}{path.suffix}.json"
+            )
+        elif len(path.name) > JSON_STEM_MAX_LENGTH:
+            metadata_path = path.with_name(f"{path.name[:JSON_STEM_MAX_LENGTH]}{JSON}")
+        elif stem := match(PARENTHESIZED_MEDIA_ITEM_STEM, path.stem):
+            if exists(
+                metadata_path := path.with_name(
+                    f"{stem['name']}{path.suffix}({stem['num']}).json"
+                )
+            ):
+                pass
+            elif exists(
+                metadata_path := path.with_name(
+                    f"{stem['name']}{path.suffix}.jpg({stem['num']}).json"
+                )
+            ):
+                pass
+        else:
+            raise ValueError(f"Can't get metadata path from {path}.")
+        if not exists(metadata_path):
+            raise ValueError(f"Metadata file for {path} does not exist.")
+    return metadata_path
+
+
+@dataclass
+class Entries:
+    """Files of a takeout directory, sorted by what they hold."""
+
+    media_items: dict[PurePath, PurePath] = field(default_factory=dict)
+    """Media item paths and their sidecar metadata paths."""
+    album_metadata: PurePath | None = None
+    orphaned_media: list[PurePath] = field(default_factory=list)
+    """Media without sidecar metadata."""
+    orphaned_sidecars: list[PurePath] = field(default_factory=list)
+    """Sidecar metadata without media, such as for media only kept in another album."""
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[PurePath]) -> Entries:
+        """Sort files in one pass, resolving sidecars against the files listed."""
+        entries = cls()
+        sidecars: set[PurePath] = set()
+        media: list[PurePath] = []
+        for path in paths:
+            if fullmatch(ALBUM_METADATA_NAME, path.name):
+                entries.album_metadata = path
+            elif path.suffix.casefold() == JSON:
+                sidecars.add(path)
+            else:
+                media.append(path)
+        for path in media:
+            try:
+                entries.media_items[path] = get_metadata_path(
+                    path, sidecars.__contains__
+                )
+            except ValueError:
+                entries.orphaned_media.append(path)
+        entries.orphaned_sidecars = sorted(sidecars - set(entries.media_items.values()))
+        return entries
+
+
+def get_entries(path: PurePath, archive: Archive | None = None) -> Entries:
+    """Sort the files of a directory, listing it once."""
+    if archive:
+        return Entries.from_paths(
+            p for p in archive.iterdir(path) if archive.is_file(p)
+        )
+    with scandir(path) as entries:
+        return Entries.from_paths(Path(e.path) for e in entries if e.is_file())
+
+
+def get_media_items(
+    path: PurePath, archive: Archive | None = None, entries: Entries | None = None
+) -> list[MediaItem]:
+    """Get media items of a directory, skipping media without sidecar metadata."""
+    entries = entries or get_entries(path, archive)
+    return [
+        MediaItem.from_path(media_item, archive, metadata_path)
+        for media_item, metadata_path in entries.media_items.items()
+    ]
+
+
+def local_exists(path: PurePath) -> bool:
+    return Path(path).exists()
+
+
+def local_read_text(path: PurePath) -> str:
+    return Path(path).read_text(encoding="utf-8")
@@ -0,0 +1,148 @@
+"""Scraped media item metadata joined with takeout media items."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from json import loads
+from pathlib import Path
+from re import fullmatch, search
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from google_photos_takeout_model.models.media_items import MediaItem
+from google_photos_takeout_model.models.scraped import Album, MediaItemMetadata
+
+ITEM_ID = r"/photo/(?P<id>[^/?#]+)"
+FILENAME = r"[^\s/\\]+\.[A-Za-z\d]{2,5}"
+TAKEN_DATE = "%b %d, %Y"
+TAKEN_TIME = "%a, %I:%M %p GMT%z"
+"""Format of the date and time lines in scraped details, e.g. `Thu, 3:04 PM GMT-06:00`."""
+
+type Match = Literal["id", "filename and time"]
+
+
+class MergedMediaItem(BaseModel):
+    media_item: MediaItem
+    metadata: MediaItemMetadata
+    match: Match
+    albums: list[str] = Field(default_factory=list)
+    people: list[str] = Field(default_factory=list)
+
+
+@dataclass
+class MediaItemIndex:
+    """Hash indexes of takeout media items by item ID, and by filename and time taken."""
+
+    ids: dict[str, MediaItem] = field(default_factory=dict)
+    filenames_and_times: defaultdict[tuple[str, int], list[MediaItem]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+
+    @classmethod
+    def from_media_items(cls, media_items: Iterable[MediaItem]) -> MediaItemIndex:
+        index = cls()
+        for media_item in media_items:
+            if item_id := get_item_id(media_item.url):
+                index.ids[item_id] = media_item
+            filename = media_item.title.casefold()
+            minute = int(media_item.photo_taken_time.timestamp) // 60
+            index.filenames_and_times[filename, minute].append(media_item)
+        return index
+
+    def find(self, metadata: MediaItemMetadata) -> tuple[MediaItem, Match] | None:
+        """Find by item ID, then by filename and minute taken.
+
+        Filename and time only match if they identify a single media item. Either alone
+        is too ambiguous, as with burst shots or camera filenames reused across years.
+        """
+        if media_item := self.ids.get(get_item_id(metadata.item)):
+            return media_item, "id"
+        filename = get_filename(metadata)
+        minute = get_minute(metadata)
+        if minute is not None and (
+            media_item := sole(self.filenames_and_times.get((filename, minute)))
+        ):
+            return media_item, "filename and time"
+        return None
+
+
+def join(
+    media_items: Iterable[MediaItem], albums: Iterable[Album]
+) -> list[MergedMediaItem]:
+    """Join scraped metadata to takeout media items in linear time.
+
+    Media items scraped from several albums are merged into one record listing each
+    album. Unmatched scraped metadata is left out.
+    """
+    index = MediaItemIndex.from_media_items(media_items)
+    merged: dict[str, MergedMediaItem] = {}
+    for album in albums:
+        for metadata in album.media_items_metadata:
+            if not (key := get_item_id(metadata.item) or metadata.item):
+                continue
+            if existing := merged.get(key):
+                existing.albums = unique([*existing.albums, album.title])
+                continue
+            if not (found := index.find(metadata)):
+                continue
+            media_item, match = found
+            merged[key] = MergedMediaItem(
+                media_item=media_item,
+                metadata=metadata,
+                match=match,
+                albums=unique([
+                    album.title,
+                    *(name.splitlines()[0] for name in metadata.albums if name),
+                ]),
+                people=unique([
+                    *(person.name for person in media_item.people),
+                    *metadata.people,
+                ]),
+            )
+    return list(merged.values())
+
+
+def get_scraped_albums(paths: Iterable[Path]) -> list[Album]:
+    return [Album(**loads(path.read_text(encoding="utf-8"))) for path in paths]
+
+
+def get_item_id(url: str) -> str:
+    return item_id["id"] if (item_id := search(ITEM_ID, url)) else ""
+
+
+def get_filename(metadata: MediaItemMetadata) -> str:
+    return next(
+        (
+            line.casefold()
+            for detail in metadata.details
+            if (line := first_line(detail)) and fullmatch(FILENAME, line)
+        ),
+        "",
+    )
+
+
+def get_minute(metadata: MediaItemMetadata) -> int | None:
+    for detail in metadata.details:
+        date, _, time = detail.partition("\n")
+        try:
+            taken = datetime.strptime(f"{date} {time}", f"{TAKEN_DATE} {TAKEN_TIME}")
+        except ValueError:
+            continue
+        return int(taken.timestamp()) // 60
+    return None
+
+
+def first_line(text: str) -> str:
+    return text.strip().partition("\n")[0].strip()
+
+
+def sole[T](items: list[T] | None) -> T | None:
+    return items[0] if items and len(items) == 1 else None
+
+
+def unique(items: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(items))
@@ -0,0 +1,144 @@
+"""Place names for media items, reverse geocoded offline from a local gazetteer."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from json import dumps, loads
+from pathlib import Path
+from re import findall
+from sys import argv
+from typing import Self
+
+import numpy as np
+from scipy.spatial import KDTree
+from tqdm import tqdm
+
+from google_photos_takeout_model.models.library import (
+    EARTH_RADIUS,
+    TAKEOUT,
+    get_coordinates,
+    get_library,
+)
+from google_photos_takeout_model.models.scraped import Album
+
+SCRAPED = [Path(arg) for arg in argv[2:]]
+"""Album JSON files written by the scrapers."""
+GAZETTEER = Path("cities1000.txt")
+"""GeoNames populated places, from `https://download.geonames.org/export/dump/`."""
+PLACES = Path("places.json")
+"""Place names keyed by media item path or scraped item URL."""
+MAX_DISTANCE = 50.0
+"""Kilometers to the nearest place beyond which a location isn't labelled."""
+NAME, LATITUDE, LONGITUDE, COUNTRY = 1, 4, 5, 8
+"""Columns of GeoNames gazetteer rows."""
+
+
+@dataclass
+class Gazetteer:
+    """Places indexed in a KD-tree of points on the unit sphere.
+
+    Straight-line distance between points on a sphere grows with great-circle distance,
+    so the nearest point in the tree is the nearest place.
+    """
+
+    names: np.ndarray
+    """Names of places, then an empty name for queries with no place in range."""
+    tree: KDTree
+
+    @classmethod
+    def from_path(cls, path: Path = GAZETTEER) -> Self:
+        names: list[str] = []
+        coords: list[tuple[float, float]] = []
+        with path.open(encoding="utf-8") as gazetteer:
+            for line in gazetteer:
+                row = line.rstrip("\n").split("\t")
+                names.append(f"{row[NAME]}, {row[COUNTRY]}")
+                coords.append((float(row[LATITUDE]), float(row[LONGITUDE])))
+        return cls(
+            np.array([*names, ""], dtype=object),
+            KDTree(to_unit_vectors(np.array(coords).reshape(-1, 2))),
+        )
+
+    def resolve(
+        self, coords: np.ndarray, max_distance: float = MAX_DISTANCE
+    ) -> list[str]:
+        """Get names of the nearest places to rows of latitude and longitude.
+
+        Rows without a location, or too far from any place, get empty names.
+        """
+        located = coords.any(axis=1)
+        _, nearest = self.tree.query(
+            to_unit_vectors(coords[located]),
+            distance_upper_bound=2 * np.sin(max_distance / EARTH_RADIUS / 2),
+            workers=-1,
+        )
+        names = np.full(len(coords), "", dtype=object)
+        # ? Queries with no place in range get the index of the empty name
+        names[located] = self.names[nearest]
+        return names.tolist()
+
+
+def main(
+    takeout: Path = TAKEOUT, scraped: list[Path] = SCRAPED, gazetteer: Path = GAZETTEER
+):
+    places = Gazetteer.from_path(gazetteer)
+    media_items = get_library(takeout)
+    labels = dict(
+        zip(
+            (item.path.as_posix() for item in media_items),
+            places.resolve(get_coordinates(media_items)),
+            strict=True,
+        )
+    )
+    for path in scraped:
+        labels |= label_scraped(
+            places, Album(**loads(path.read_text(encoding="utf-8")))
+        )
+    labelled = {key: place for key, place in labels.items() if place}
+    tqdm.write(f"Labelled {len(labelled)} of {len(labels)} items.")
+    PLACES.write_text(
+        encoding="utf-8", data=f"{dumps(labelled, indent=2, ensure_ascii=False)}\n"
+    )
+
+
+def label_scraped(places: Gazetteer, album: Album) -> dict[str, str]:
+    """Get place names of scraped items, keyed by item URL."""
+    items = [item for item in album.media_items_metadata if item.item]
+    return dict(
+        zip(
+            (item.item for item in items),
+            places.resolve(
+                np.array(
+                    [parse_position(item.position) for item in items], dtype=np.float64
+                ).reshape(-1, 2)
+            ),
+            strict=True,
+        )
+    )
+
+
+def parse_position(position: str) -> tuple[float, float]:
+    """Get latitude and longitude from the first two numbers of a map position.
+
+    Positions that don't hold a valid coordinate pair give zeros, like unlocated items.
+    """
+    numbers = [float(number) for number in findall(r"-?\d+(?:\.\d+)?", position)]
+    if len(numbers) < 2:
+        return 0.0, 0.0
+    latitude, longitude = numbers[:2]
+    if abs(latitude) > 90 or abs(longitude) > 180:
+        return 0.0, 0.0
+    return latitude, longitude
+
+
+def to_unit_vectors(coords: np.ndarray) -> np.ndarray:
+    latitude, longitude = np.radians(coords).T
+    return np.column_stack((
+        np.cos(latitude) * np.cos(longitude),
+        np.cos(latitude) * np.sin(longitude),
+        np.sin(latitude),
+    ))
+
+
+if __name__ == "__main__":
+    main()
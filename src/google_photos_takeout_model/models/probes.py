@@ -0,0 +1,364 @@
+"""Media file probes reading only container headers and sampled content."""
+
+from __future__ import annotations
+
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from datetime import UTC, datetime, timedelta
+from hashlib import blake2b
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from struct import error as StructError  # noqa: N812
+from struct import unpack_from
+from typing import Literal
+
+from google_photos_takeout_model.models.bases import ToCamelBaseModel
+
+SAMPLE = 1 << 16
+"""Bytes hashed from the start, middle and end of a file for its fingerprint."""
+WORKERS = 16
+EXIF_TIME = "%Y:%m:%d %H:%M:%S"
+QUICKTIME_EPOCH = datetime(1904, 1, 1, tzinfo=UTC)
+JPEG_SOF = {*range(0xC0, 0xD0)} - {0xC4, 0xC8, 0xCC}
+"""JPEG start of frame markers, excluding DHT, JPG and DAC."""
+JPEG_SOS = 0xDA
+EXIF_IFD = 0x8769
+ORIENTATION = 0x0112
+TRANSPOSED = {5, 6, 7, 8}
+"""Exif orientations that swap width and height, rotating by a quarter turn."""
+DATE_TIME = 0x0132
+DATE_TIME_ORIGINAL = 0x9003
+OFFSET_TIME_ORIGINAL = 0x9011
+CONTAINERS = {b"moov", b"trak", b"mdia", b"iprp", b"ipco"}
+"""ISO BMFF boxes holding the boxes we probe."""
+
+type Format = Literal["jpeg", "png", "isobmff", "unknown"]
+
+
+class Probe(ToCamelBaseModel):
+    path: Path
+    size: int
+    format: Format = "unknown"
+    width: int | None = None
+    height: int | None = None
+    duration: float | None = None
+    """Duration in seconds."""
+    taken: datetime | None = None
+    """Capture time embedded in the file."""
+    fingerprint: str = ""
+    """BLAKE2b of the size and sampled content, identifying files without full reads."""
+
+
+def get_probes(paths: Iterable[Path], workers: int = WORKERS) -> list[Probe]:
+    """Probe files concurrently, since probes mostly wait on disk reads."""
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(get_probe, paths))
+
+
+def get_probe(path: Path) -> Probe:
+    """Probe a media file, reading only the headers and samples it needs.
+
+    Memory mapping the file means only the pages touched are read from disk, so
+    multi-gigabyte videos probe about as fast as small images.
+    """
+    with mapped(path) as data:
+        probe = Probe(path=path, size=len(data), fingerprint=fingerprint(data))
+        # ? Truncated or malformed headers leave remaining fields unset
+        with suppress(StructError, ValueError, LookupError):
+            if data[:3] == b"\xff\xd8\xff":
+                probe.format = "jpeg"
+                probe_jpeg(data, probe)
+            elif data[:8] == b"\x89PNG\r\n\x1a\n":
+                probe.format = "png"
+                probe_png(data, probe)
+            elif data[4:8] == b"ftyp":
+                probe.format = "isobmff"
+                probe_isobmff(data, probe)
+    return probe
+
+
+@contextmanager
+def mapped(path: Path) -> Generator[mmap | bytes]:
+    with path.open("rb") as file:
+        # ? Empty files can't be mapped
+        if not path.stat().st_size:
+            yield b""
+            return
+        with mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+            yield data
+
+
+def fingerprint(data: mmap | bytes) -> str:
+    size = len(data)
+    digest = blake2b(size.to_bytes(8, "little"), digest_size=16)
+    if size <= 3 * SAMPLE:
+        digest.update(data[:])
+    else:
+        for start in (0, (size - SAMPLE) // 2, size - SAMPLE):
+            digest.update(data[start : start + SAMPLE])
+    return digest.hexdigest()
+
+
+def probe_jpeg(data: mmap | bytes, probe: Probe):
+    """Walk JPEG segments up to the scan for the frame size and Exif capture time.
+
+    The size is as displayed, with width and height swapped by the Exif orientation.
+    """
+    orientation = 1
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == JPEG_SOS:
+            break
+        (length,) = unpack_from(">H", data, pos + 2)
+        segment = pos + 4
+        if marker in JPEG_SOF:
+            probe.height, probe.width = unpack_from(">HH", data, segment + 1)
+        elif marker == 0xE1 and data[segment : segment + 6] == b"Exif\0\0":
+            tags = read_exif(data[segment + 6 : pos + 2 + length])
+            probe.taken = probe.taken or get_exif_taken(tags)
+            orientation = int(tags.get(ORIENTATION, orientation))
+        pos += 2 + length
+    if orientation in TRANSPOSED:
+        probe.width, probe.height = probe.height, probe.width
+
+
+def probe_png(data: mmap | bytes, probe: Probe):
+    """Read the size from IHDR and capture time from eXIf chunks before image data."""
+    probe.width, probe.height = unpack_from(">II", data, 16)
+    pos = 8
+    while pos + 8 <= len(data):
+        length, kind = unpack_from(">I4s", data, pos)
+        if kind == b"IDAT":
+            break
+        if kind == b"eXIf":
+            probe.taken = get_exif_taken(read_exif(data[pos + 8 : pos + 8 + length]))
+        pos += 12 + length
+
+
+def probe_isobmff(data: mmap | bytes, probe: Probe):
+    """Probe MP4, QuickTime and HEIC boxes for size, duration and capture time."""
+    for kind, start, end in walk_boxes(data, 0, len(data)):
+        match kind:
+            case b"mvhd":
+                probe_mvhd(data, start, probe)
+            case b"tkhd" if not probe.width:
+                # ? Width and height are 16.16 fixed point at the end of the box
+                width, height = unpack_from(">II", data, end - 8)
+                probe.width, probe.height = width >> 16, height >> 16
+            case b"meta" if data[start : start + 4] == b"\0\0\0\0":
+                # ? Only HEIC has a full box here, QuickTime starts with a child box
+                probe_heic(data, start + 4, end, probe)
+            case _:
+                pass
+
+
+def probe_mvhd(data: mmap | bytes, start: int, probe: Probe):
+    """Read duration and creation time from a movie header."""
+    created, _, timescale, duration = unpack_from(
+        ">QQIQ" if data[start] == 1 else ">IIII", data, start + 4
+    )
+    if timescale:
+        probe.duration = duration / timescale
+    if created:
+        probe.taken = QUICKTIME_EPOCH + timedelta(seconds=created)
+
+
+def walk_boxes(
+    data: mmap | bytes, start: int, end: int
+) -> Iterator[tuple[bytes, int, int]]:
+    """Walk ISO BMFF boxes, descending into containers, yielding payload spans."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            (size,) = unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        payload, box_end = pos + header, min(pos + size, end)
+        yield kind, payload, box_end
+        if kind in CONTAINERS:
+            yield from walk_boxes(data, payload, box_end)
+        pos += size
+
+
+def probe_heic(data: mmap | bytes, start: int, end: int, probe: Probe):
+    """Probe a HEIC `meta` box for the primary image size and its Exif capture time."""
+    primary = exif_id = None
+    locations: dict[int, tuple[int, int]] = {}
+    properties: list[tuple[bytes, int, int]] = []
+    associations: dict[int, list[int]] = {}
+    for kind, box_start, box_end in walk_boxes(data, start, end):
+        match kind:
+            case b"pitm":
+                primary, _ = read_uint(
+                    data, box_start + 4, 2 if not data[box_start] else 4
+                )
+            case b"iinf":
+                exif_id = get_exif_item_id(data, box_start, box_end)
+            case b"iloc":
+                locations = get_item_locations(data, box_start)
+            case b"ipco":
+                properties = list(walk_boxes(data, box_start, box_end))
+            case b"ipma":
+                associations = get_item_properties(data, box_start)
+            case _:
+                pass
+    if primary is not None:
+        # ? Property indices are one-based, with zero meaning none
+        probe_heic_size(
+            data,
+            [
+                properties[idx - 1]
+                for idx in associations.get(primary, [])
+                if 0 < idx <= len(properties)
+            ],
+            probe,
+        )
+    if exif_id is not None and exif_id in locations:
+        # ? Exif items start with the offset to the TIFF header
+        offset, length = locations[exif_id]
+        (skip,) = unpack_from(">I", data, offset)
+        probe.taken = get_exif_taken(
+            read_exif(data[offset + 4 + skip : offset + length])
+        )
+
+
+def probe_heic_size(
+    data: mmap | bytes, properties: list[tuple[bytes, int, int]], probe: Probe
+):
+    """Get the displayed size of a HEIC image from its properties, in order.
+
+    The coded size may be padded or tiled, so the clean aperture crops it, and rotation
+    by a quarter turn swaps width and height.
+    """
+    for kind, start, _ in properties:
+        match kind:
+            case b"ispe":
+                probe.width, probe.height = unpack_from(">II", data, start + 4)
+            case b"clap":
+                width_n, width_d, height_n, height_d = unpack_from(">IIII", data, start)
+                if width_d and height_d:
+                    probe.width, probe.height = width_n // width_d, height_n // height_d
+            case b"irot" if data[start] & 1:
+                probe.width, probe.height = probe.height, probe.width
+            case _:
+                pass
+
+
+def get_exif_item_id(data: mmap | bytes, start: int, end: int) -> int | None:
+    version = data[start]
+    pos = start + 4 + (2 if version == 0 else 4)
+    for kind, entry_start, _ in walk_boxes(data, pos, end):
+        if kind != b"infe" or data[entry_start] < 2:
+            continue
+        if data[entry_start] == 2:
+            item_id, _, item_type = unpack_from(">HH4s", data, entry_start + 4)
+        else:
+            item_id, _, item_type = unpack_from(">IH4s", data, entry_start + 4)
+        if item_type == b"Exif":
+            return item_id
+    return None
+
+
+def get_item_properties(data: mmap | bytes, start: int) -> dict[int, list[int]]:
+    """Get indices of the properties associated with each item in an `ipma` box."""
+    version, flags = data[start], data[start + 3]
+    count, pos = read_uint(data, start + 4, 4)
+    associations: dict[int, list[int]] = {}
+    for _ in range(count):
+        item_id, pos = read_uint(data, pos, 2 if version < 1 else 4)
+        indices, pos = read_uint(data, pos, 1)
+        for _ in range(indices):
+            # ? The high bit marks essential properties
+            if flags & 1:
+                index, pos = read_uint(data, pos, 2)
+                associations.setdefault(item_id, []).append(index & 0x7FFF)
+            else:
+                index, pos = read_uint(data, pos, 1)
+                associations.setdefault(item_id, []).append(index & 0x7F)
+    return associations
+
+
+def get_item_locations(data: mmap | bytes, start: int) -> dict[int, tuple[int, int]]:
+    """Get the offset and length of the first extent of each item in an `iloc` box."""
+    version = data[start]
+    sizes, more_sizes = data[start + 4], data[start + 5]
+    offset_size, length_size = sizes >> 4, sizes & 0xF
+    base_offset_size, index_size = more_sizes >> 4, more_sizes & 0xF
+    pos = start + 6
+    count, pos = read_uint(data, pos, 2 if version < 2 else 4)
+    locations: dict[int, tuple[int, int]] = {}
+    for _ in range(count):
+        item_id, pos = read_uint(data, pos, 2 if version < 2 else 4)
+        if version in {1, 2}:
+            pos += 2  # ? Construction method
+        pos += 2  # ? Data reference index
+        base_offset, pos = read_uint(data, pos, base_offset_size)
+        extents, pos = read_uint(data, pos, 2)
+        for extent in range(extents):
+            if version in {1, 2}:
+                _, pos = read_uint(data, pos, index_size)
+            offset, pos = read_uint(data, pos, offset_size)
+            length, pos = read_uint(data, pos, length_size)
+            if not extent:
+                locations[item_id] = (base_offset + offset, length)
+    return locations
+
+
+def read_uint(data: mmap | bytes, pos: int, size: int) -> tuple[int, int]:
+    return int.from_bytes(data[pos : pos + size], "big"), pos + size
+
+
+def read_exif(tiff: bytes) -> dict[int, int | str]:
+    """Read tags of the first image and Exif directories, from the TIFF header."""
+    order = {b"II": "<", b"MM": ">"}[tiff[:2]]
+    (ifd0,) = unpack_from(f"{order}I", tiff, 4)
+    tags = read_ifd(tiff, order, ifd0)
+    if EXIF_IFD in tags:
+        tags |= read_ifd(tiff, order, int(tags[EXIF_IFD]))
+    return tags
+
+
+def get_exif_taken(tags: dict[int, int | str]) -> datetime | None:
+    """Get the capture time from Exif tags."""
+    if not (taken := tags.get(DATE_TIME_ORIGINAL) or tags.get(DATE_TIME)):
+        return None
+    try:
+        time = datetime.strptime(str(taken), EXIF_TIME)
+    except ValueError:
+        return None
+    if offset := tags.get(OFFSET_TIME_ORIGINAL):
+        with suppress(ValueError):
+            return datetime.strptime(f"{time:%Y%m%d%H%M%S}{offset}", "%Y%m%d%H%M%S%z")
+    return time
+
+
+def read_ifd(tiff: bytes, order: str, offset: int) -> dict[int, int | str]:
+    """Read ASCII, SHORT and LONG entries of a TIFF image file directory."""
+    (count,) = unpack_from(f"{order}H", tiff, offset)
+    tags: dict[int, int | str] = {}
+    for entry in range(offset + 2, offset + 2 + 12 * count, 12):
+        tag, kind, length = unpack_from(f"{order}HHI", tiff, entry)
+        if kind == 2:
+            start = (
+                entry + 8
+                if length <= 4
+                else unpack_from(f"{order}I", tiff, entry + 8)[0]
+            )
+            tags[tag] = (
+                tiff[start : start + length].split(b"\0")[0].decode("ascii", "replace")
+            )
+        elif kind == 3:
+            (tags[tag],) = unpack_from(f"{order}H", tiff, entry + 8)
+        elif kind == 4:
+            (tags[tag],) = unpack_from(f"{order}I", tiff, entry + 8)
+    return tags
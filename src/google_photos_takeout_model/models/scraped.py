@@ -0,0 +1,20 @@
+"""Media item metadata scraped from Google Photos."""
+
+from pydantic import BaseModel, Field
+
+
+class MediaItemMetadata(BaseModel):
+    item: str = ""
+    people: list[str] = Field(default_factory=list)
+    albums: list[str] = Field(default_factory=list)
+    details: list[str] = Field(default_factory=list)
+    position: str = ""
+    source: str = ""
+    """Download URL of the original."""
+    preview: str = ""
+
+
+class Album(BaseModel):
+    title: str = ""
+    item: str = ""
+    media_items_metadata: list[MediaItemMetadata] = Field(default_factory=list)
@@ -0,0 +1,191 @@
+"""Thumbnails of media items in a content-addressed cache, for browsing the library."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, field
+from hashlib import blake2b, file_digest
+from json import dumps, loads
+from os import cpu_count, getpid, utime
+from pathlib import Path
+from typing import Self
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from tqdm import tqdm
+
+from google_photos_takeout_model.models.duplicates import IMAGES
+from google_photos_takeout_model.models.library import TAKEOUT, get_stat
+from google_photos_takeout_model.models.media_items import MediaItem, get_media_items
+
+with suppress(ImportError):
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+
+TREES = ("people", "undated", "years")
+"""Directories of the takeout holding album directories to make thumbnails for."""
+THUMBNAILS = Path("thumbnails")
+INDEX = "index.json"
+SIZE = 256
+"""Longest side of thumbnails in pixels."""
+QUALITY = 85
+LIMIT = 2 << 30
+"""Bytes of thumbnails kept, evicting those least recently used beyond it."""
+WORKERS = cpu_count() or 1
+
+
+@dataclass
+class Thumbnails:
+    """Thumbnails keyed by the content of their originals, looked up by media item.
+
+    The index maps original paths to their size, modification time and content key, so
+    only new or modified originals are hashed again. Identical originals share a
+    thumbnail. Getting a thumbnail marks it used by touching it, while updating the cache
+    only checks for thumbnails, so eviction removes the least recently used first.
+    """
+
+    root: Path = THUMBNAILS
+    size: int = SIZE
+    limit: int = LIMIT
+    index: dict[str, tuple[int, int, str]] = field(default_factory=dict)
+    """Size, modification time and key of originals, keyed by POSIX path."""
+
+    @classmethod
+    def from_path(
+        cls, root: Path = THUMBNAILS, size: int = SIZE, limit: int = LIMIT
+    ) -> Self:
+        index = root / INDEX
+        return cls(
+            root,
+            size,
+            limit,
+            {
+                key: (orig_size, mtime, thumb)
+                for key, [orig_size, mtime, thumb] in (
+                    loads(index.read_text(encoding="utf-8")).items()
+                    if index.exists()
+                    else ()
+                )
+            },
+        )
+
+    def get(self, media_item: MediaItem) -> Path | None:
+        """Get the thumbnail of a media item and mark it used, if it's up to date."""
+        if thumbnail := self.find(media_item):
+            utime(thumbnail)
+        return thumbnail
+
+    def find(self, media_item: MediaItem) -> Path | None:
+        """Find the thumbnail of a media item, if it's cached and the original unchanged."""
+        if not (entry := self.index.get(media_item.path.as_posix())):
+            return None
+        *stat, key = entry
+        with suppress(FileNotFoundError):
+            if (
+                tuple(stat) == get_stat(media_item.path)
+                and (thumbnail := get_thumbnail_path(self.root, key)).exists()
+            ):
+                return thumbnail
+        return None
+
+    def update(self, media_items: Iterable[MediaItem], workers: int = WORKERS) -> int:
+        """Make missing thumbnails on a process pool, returning the number looked at."""
+        stale = [
+            (item.path, get_stat(item.path))
+            for item in media_items
+            if item.path.suffix.casefold() in IMAGES and not self.find(item)
+        ]
+        with (
+            ProcessPoolExecutor(workers) as executor,
+            tqdm(total=len(stale), unit="image", smoothing=0) as progress,
+        ):
+            for (path, stat), key in zip(
+                stale,
+                executor.map(
+                    make_thumbnail,
+                    (path for path, _ in stale),
+                    (self.root for _ in stale),
+                    (self.size for _ in stale),
+                    chunksize=16,
+                ),
+                strict=True,
+            ):
+                progress.update()
+                if key:
+                    self.index[path.as_posix()] = (*stat, key)
+                else:
+                    self.index.pop(path.as_posix(), None)
+        self.evict()
+        self.write()
+        return len(stale)
+
+    def evict(self):
+        """Remove least recently used thumbnails until the cache is within its limit."""
+        thumbnails = sorted(
+            (stat.st_mtime_ns, stat.st_size, path)
+            for path in self.root.glob("*/*.jpg")
+            for stat in (path.stat(),)
+        )
+        total = sum(size for _, size, _ in thumbnails)
+        for _, size, path in thumbnails:
+            if total <= self.limit:
+                break
+            path.unlink()
+            total -= size
+
+    def write(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / INDEX).write_text(
+            encoding="utf-8",
+            data=f"{dumps(self.index, indent=2, ensure_ascii=False)}\n",
+        )
+
+
+def main(takeout: Path = TAKEOUT):
+    thumbnails = Thumbnails.from_path()
+    media_items = [
+        item
+        for tree in TREES
+        if (takeout / tree).is_dir()
+        for album in sorted((takeout / tree).iterdir())
+        for item in get_media_items(album)
+    ]
+    made = thumbnails.update(media_items)
+    tqdm.write(f"Updated {made} of {len(media_items)} thumbnails.")
+
+
+def get_thumbnail_path(root: Path, key: str) -> Path:
+    return root / key[:2] / f"{key}.jpg"
+
+
+def make_thumbnail(path: Path, root: Path, size: int = SIZE) -> str:
+    """Make a thumbnail unless one exists for the same content, returning its key.
+
+    Keys hash the whole original, so only identical originals share a thumbnail. JPEGs
+    are decoded at a reduced scale, and every image is turned upright. Images that can't
+    be decoded give an empty key.
+    """
+    with path.open("rb") as file:
+        key = f"{file_digest(file, lambda: blake2b(digest_size=16)).hexdigest()}-{size}"
+    thumbnail = get_thumbnail_path(root, key)
+    if thumbnail.exists():
+        return key
+    try:
+        with Image.open(path) as image:
+            image.draft("RGB", (size, size))
+            upright = ImageOps.exif_transpose(image).convert("RGB")
+            upright.thumbnail((size, size), Image.Resampling.LANCZOS)
+            thumbnail.parent.mkdir(parents=True, exist_ok=True)
+            # ? Write then rename, so readers never see a partial thumbnail
+            part = thumbnail.with_name(f"{key}.{getpid()}.part")
+            upright.save(part, "JPEG", quality=QUALITY)
+            part.replace(thumbnail)
+    except (OSError, UnidentifiedImageError, ValueError):
+        return ""
+    return key
+
+
+if __name__ == "__main__":
+    main()
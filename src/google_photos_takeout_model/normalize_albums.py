@@ -1,7 +1,9 @@
+from asyncio import run
 from sys import argv
 
-from google_photos_takeout_model.get_media_metadata import login_and_reveal_info
-from google_photos_takeout_model.get_media_metadata2 import album
+from playwright.async_api import BrowserContext
+
+from google_photos_takeout_model.get_media_metadata import album, login_and_reveal_info
 from google_photos_takeout_model.pw import context, locator2
 
 ALBUM_URLS = argv[1:]
@@ -9,7 +11,16 @@ ALBUM_URLS = argv[1:]
 
 async def main(urls: list[str] = ALBUM_URLS):
     await login_and_reveal_info()
-    async with context() as ctx, locator2(ctx) as loc:
+    async with context() as ctx:
+        await normalize(ctx, urls)
+
+
+async def normalize(ctx: BrowserContext, urls: list[str] = ALBUM_URLS):
+    async with locator2(ctx) as loc:
         for url in urls:
             async with album(loc, url):
                 pass
+
+
+if __name__ == "__main__":
+    run(main())
@@ -1,21 +1,26 @@
+"""Browser automation for Google Photos.
+
+Playwright is imported on first use and credentials are read on login, so importing
+this module and its constants is cheap and works without either.
+"""
+
+from __future__ import annotations
+
+from asyncio import Lock
 from contextlib import asynccontextmanager
 from os import environ
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pyautogui
-from playwright.async_api import (
-    BrowserContext,
-    Locator,
-    PlaywrightContextManager,
-    ViewportSize,
-)
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
 
-EMAIL = environ["GPHOTOS_EMAIL"]
-PASSWORD = environ["GPHOTOS_PASSWORD"]
+    from playwright.async_api import BrowserContext, Locator
 
-pyautogui.PAUSE = 0.2
 GPHOTOS_BASE_URL = "https://photos.google.com"
 STORAGE_STATE = Path("storage-state.json")
+HAR = Path("photos.har")
+"""Recorded Google Photos traffic for offline replay."""
 
 ITEM_SELECTION_THRESHOLD = 490
 """Behavior varies when selections exceed this threshold, resulting in batching."""
@@ -30,6 +35,8 @@ LONG_WAIT = 5.0
 
 @asynccontextmanager
 async def browser(headless: bool = True, login: bool = False):
+    from playwright.async_api import PlaywrightContextManager  # noqa: PLC0415
+
     async with PlaywrightContextManager() as pw:
         browser = await pw.chromium.launch(
             args=(
@@ -49,19 +56,45 @@ async def browser(headless: bool = True, login: bool = False):
 
 
 @asynccontextmanager
-async def context(headless: bool = True, login: bool = False):
+async def context(
+    headless: bool = True,
+    login: bool = False,
+    har: Path | None = None,
+    record: bool = False,
+):
     if not STORAGE_STATE.exists():
         STORAGE_STATE.write_text(encoding="utf-8", data="{}")
     async with browser(headless, login) as b:
         ctx = await b.new_context(
             reduced_motion="reduce",
             storage_state=STORAGE_STATE,
-            viewport=None if login else ViewportSize(width=1920, height=5000),
+            viewport=None if login else {"width": 1920, "height": 5000},
         )
+        if har:
+            # ? Record on context close if `record`, otherwise replay and abort misses
+            await ctx.route_from_har(
+                har,
+                not_found="fallback" if record else "abort",
+                update=record,
+                update_content="embed",
+            )
         yield ctx
         await ctx.close()
 
 
+@asynccontextmanager
+async def request_context(storage_state: Path = STORAGE_STATE):
+    """Make HTTP requests with the session cookies of the browser, without a browser."""
+    from playwright.async_api import PlaywrightContextManager  # noqa: PLC0415
+
+    async with PlaywrightContextManager() as pw:
+        request = await pw.request.new_context(
+            storage_state=storage_state if storage_state.exists() else None
+        )
+        yield request
+        await request.dispose()
+
+
 @asynccontextmanager
 async def locator(headless: bool = True, login: bool = False):
     async with context(headless, login) as ctx:
@@ -81,6 +114,22 @@ async def locator2(ctx: BrowserContext):
     await pg.close()
 
 
+@asynccontextmanager
+async def locator_pool(
+    ctx: BrowserContext, pages: int
+) -> AsyncGenerator[list[tuple[Locator, Lock]]]:
+    """Open pages for tasks to share, each locked while a task uses it."""
+    pool: list[tuple[Locator, Lock]] = []
+    try:
+        for _ in range(pages):
+            # ? Add each page once open, so it's closed even if opening the next fails
+            pool.append(((await ctx.new_page()).locator("*"), Lock()))  # noqa: PERF401
+        yield pool
+    finally:
+        for loc, _ in pool:
+            await loc.page.close()
+
+
 @asynccontextmanager
 async def logged_in(headless: bool = False):
     async with locator(headless=headless, login=True) as loc:
@@ -88,25 +137,48 @@ async def logged_in(headless: bool = False):
         yield loc
 
 
+async def log_in_if_expired():
+    """Log in with a visible browser only if the stored session no longer works."""
+    if not await has_session():
+        async with logged_in():
+            pass
+
+
+async def has_session() -> bool:
+    """Check headlessly whether the stored session still opens Google Photos."""
+    async with context() as ctx, locator2(ctx) as loc:
+        await loc.page.goto(GPHOTOS_BASE_URL)
+        # ? Signed out visitors are sent to a page about Google Photos elsewhere
+        return loc.page.url.startswith(f"{GPHOTOS_BASE_URL}/")
+
+
 async def log_in(loc: Locator):
     async with loc.page.expect_navigation(
         url=f"{GPHOTOS_BASE_URL}/", timeout=LOGIN_TIMEOUT
     ):
         await loc.page.goto(f"{GPHOTOS_BASE_URL}/login")
         if await loc_exact_heading(loc, "Sign in").count():
-            await loc.get_by_label("Email or phone", exact=True).fill(EMAIL)
+            await loc.get_by_label("Email or phone", exact=True).fill(get_email())
             await loc_next(loc).click()
-            await loc_password(loc).fill(PASSWORD)
+            await loc_password(loc).fill(get_password())
             await loc_next(loc).click()
             if await loc.get_by_text("2-Step Verification", exact=True).count():
                 pass
         elif await loc_exact_heading(loc, "Choose an account").count():
             await loc.get_by_role("link", name="Signed out").click()
-            await loc_password(loc).fill(PASSWORD)
+            await loc_password(loc).fill(get_password())
             await loc_next(loc).click()
     await loc.page.context.storage_state(path=STORAGE_STATE)
 
 
+def get_email() -> str:
+    return environ["GPHOTOS_EMAIL"]
+
+
+def get_password() -> str:
+    return environ["GPHOTOS_PASSWORD"]
+
+
 def loc_password(loc: Locator) -> Locator:
     return loc.get_by_label("Enter your password", exact=True)
 
@@ -0,0 +1,304 @@
+"""Record and replay Google Photos pages for offline benchmarks and tests."""
+
+from __future__ import annotations
+
+from asyncio import run
+from base64 import b64encode
+from collections import Counter, defaultdict
+from collections.abc import Callable, Coroutine, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial, wraps
+from hashlib import md5
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from inspect import iscoroutinefunction
+from io import BytesIO
+from pathlib import Path
+from re import compile, fullmatch  # noqa: A004
+from statistics import fmean
+from sys import argv
+from threading import Thread
+from time import perf_counter
+from typing import Any, BinaryIO, cast
+from urllib.parse import urlparse
+
+from playwright.async_api import (
+    Keyboard,
+    Locator,
+    Mouse,
+    Page,
+    Request,
+    Route,
+    TimeoutError,  # noqa: A004
+)
+from tqdm import tqdm
+
+from google_photos_takeout_model import select_all_photos
+from google_photos_takeout_model.get_media_metadata import (
+    MediaItemMetadata,
+    loc_albums_containing_item,
+    loc_details,
+    loc_info,
+    loc_map,
+    loc_people,
+    login_and_reveal_info,
+    slow_retry,
+    update_media_item_metadata,
+)
+from google_photos_takeout_model.pw import HAR, context, locator2
+
+URLS = argv[1:]
+RECORD = False
+REPLAY_HAR = False
+"""Replay recorded traffic instead of serving snapshots from the stand-in server."""
+SNAPSHOTS = Path("snapshots")
+"""Rendered pages served by the local stand-in server."""
+STAND_IN_HOST = "127.0.0.1"
+LOCATOR_STEPS = ["loc_albums_containing_item", "loc_map", "loc_details", "loc_people"]
+"""Steps that read item metadata field by field, as scrapers did before the evaluate."""
+EVALUATE_STEP = "update_media_item_metadata"
+"""Step that reads item metadata in one page-side evaluate."""
+
+
+@dataclass
+class Timings:
+    durations: defaultdict[str, list[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    requests: defaultdict[str, list[int]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    round_trips: defaultdict[str, list[int]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+
+
+async def main(urls: list[str] = URLS, record: bool = RECORD, har: bool = REPLAY_HAR):
+    if record:
+        return await record_pages(urls)
+    if har:
+        return report(await benchmark(urls, HAR))
+    with serve() as base_url:
+        timings = await benchmark([stand_in_url(base_url, url) for url in urls])
+    report(timings)
+
+
+async def record_pages(urls: list[str], har: Path = HAR, root: Path = SNAPSHOTS):
+    """Record traffic to a HAR and snapshot rendered pages for the stand-in server."""
+    await login_and_reveal_info()
+    async with context(har=har, record=True) as ctx, locator2(ctx) as loc:
+        for url in urls:
+            await slow_retry(TimeoutError)(loc.page.goto)(url)
+            if is_item(url):
+                await update_media_item_metadata(loc, MediaItemMetadata())
+            await snapshot(loc, root)
+
+
+async def snapshot(loc: Locator, root: Path = SNAPSHOTS):
+    path = snapshot_path(root, loc.page.url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(encoding="utf-8", data=await loc.page.content())
+
+
+def snapshot_path(root: Path, url: str) -> Path:
+    return root / urlparse(url).path.strip("/") / "index.html"
+
+
+def stand_in_url(base_url: str, url: str) -> str:
+    return f"{base_url}/{urlparse(url).path.strip('/')}/"
+
+
+def is_item(url: str) -> bool:
+    return "/photo/" in url
+
+
+@contextmanager
+def serve(root: Path = SNAPSHOTS, port: int = 0) -> Generator[str]:
+    """Serve snapshots from a local stand-in for `photos.google.com`."""
+    handler = partial(StandInHandler, directory=root)
+    with ThreadingHTTPServer((STAND_IN_HOST, port), handler) as server:
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            yield f"http://{STAND_IN_HOST}:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    """Serve files quietly, with byte ranges and checksums like Google's media hosts."""
+
+    def log_message(self, format: str, *args: Any):  # noqa: A002
+        pass
+
+    def send_head(self) -> BinaryIO | None:
+        if not (path := Path(self.translate_path(self.path))).is_file():
+            return super().send_head()
+        data = path.read_bytes()
+        start, end = 0, len(data) - 1
+        if byte_range := fullmatch(r"bytes=(\d+)-(\d*)", self.headers["Range"] or ""):
+            start = int(byte_range[1])
+            end = min(int(byte_range[2] or end), end)
+            if start > end:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        self.send_header(
+            "x-goog-hash",
+            f"md5={b64encode(md5(data, usedforsecurity=False).digest()).decode()}",
+        )
+        self.end_headers()
+        return BytesIO(data[start : end + 1])
+
+
+async def benchmark(urls: list[str], har: Path | None = None) -> Timings:
+    """Time scrapers and locator helpers against replayed or stand-in pages."""
+    timings = Timings()
+    async with context(har=har) as ctx, locator2(ctx) as loc:
+        if not har:
+            await ctx.route(compile(rf"^(?!http://{STAND_IN_HOST}:)"), abort)
+        calls = Calls()
+        loc = cast(Locator, Counted(loc, calls))
+        for url in urls:
+            await loc.page.goto(url)
+            if not is_item(url):
+                await timed(
+                    loc.page,
+                    calls,
+                    timings,
+                    "select_all_photos",
+                    lambda: select_all_photos(loc),
+                )
+                continue
+            steps: dict[str, Callable[[], Coroutine[Any, Any, Any]]] = {
+                "loc_info": loc_info(loc).count,
+                "loc_albums_containing_item": loc_albums_containing_item(
+                    loc
+                ).all_inner_texts,
+                "loc_map": loc_map(loc).count,
+                "loc_details": loc_details(loc).all_inner_texts,
+                "loc_people": loc_people(loc).all_inner_texts,
+                EVALUATE_STEP: lambda: update_media_item_metadata(
+                    loc, MediaItemMetadata()
+                ),
+            }
+            for name, step in steps.items():
+                await timed(loc.page, calls, timings, name, step)
+    return timings
+
+
+async def abort(route: Route):
+    await route.abort()
+
+
+async def timed[T](
+    page: Page,
+    calls: Calls,
+    timings: Timings,
+    name: str,
+    step: Callable[[], Coroutine[Any, Any, T]],
+) -> T:
+    with count_requests(page) as requests:
+        calls.count = 0
+        start = perf_counter()
+        result = await step()
+        timings.durations[name].append(perf_counter() - start)
+    timings.round_trips[name].append(calls.count)
+    timings.requests[name].append(requests.total())
+    return result
+
+
+@contextmanager
+def count_requests(page: Page) -> Generator[Counter[str]]:
+    """Count network requests made by a page, by resource type."""
+    counts: Counter[str] = Counter()
+
+    def count(request: Request):
+        counts[request.resource_type] += 1
+
+    page.on("request", count)
+    try:
+        yield counts
+    finally:
+        page.remove_listener("request", count)
+
+
+@dataclass
+class Calls:
+    """Driver round-trips, one per awaited Playwright call."""
+
+    count: int = 0
+
+
+COUNTED = (Locator, Page, Keyboard, Mouse)
+"""Playwright objects whose awaited calls are counted as driver round-trips."""
+
+
+class Counted:
+    """Count awaited calls of a Playwright object and of the objects it hands out."""
+
+    def __init__(self, obj: Any, calls: Calls):
+        self.obj = obj
+        self.calls = calls
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.obj, name)
+        if iscoroutinefunction(attr):
+
+            @wraps(attr)
+            async def counted(*args: Any, **kwargs: Any) -> Any:
+                self.calls.count += 1
+                return await attr(*unwrap(args), **unwrap(kwargs))
+
+            return counted
+        if callable(attr):
+
+            @wraps(attr)
+            def handed_out(*args: Any, **kwargs: Any) -> Any:
+                return count(attr(*unwrap(args), **unwrap(kwargs)), self.calls)
+
+            return handed_out
+        return count(attr, self.calls)
+
+
+def count(obj: Any, calls: Calls) -> Any:
+    return Counted(obj, calls) if isinstance(obj, COUNTED) else obj
+
+
+def unwrap(args: Any) -> Any:
+    """Hand the wrapped objects back to Playwright, which expects its own."""
+    if isinstance(args, dict):
+        return {k: unwrap(v) for k, v in cast(dict[str, Any], args).items()}
+    if isinstance(args, tuple):
+        return tuple(unwrap(v) for v in cast(tuple[Any, ...], args))
+    return args.obj if isinstance(args, Counted) else args
+
+
+def report(timings: Timings):
+    for name, durations in timings.durations.items():
+        tqdm.write(
+            f"{name}: {len(durations)} calls, {1e3 * fmean(durations):.1f} ms/call, "
+            f"{len(durations) / sum(durations):.2f} calls/s, "
+            f"{fmean(timings.round_trips[name]):.1f} round-trips/call, "
+            f"{fmean(timings.requests[name]):.1f} requests/call"
+        )
+    if items := timings.round_trips[EVALUATE_STEP]:
+        tqdm.write(
+            "Round-trips per item: "
+            f"{sum(fmean(timings.round_trips[name]) for name in LOCATOR_STEPS):.1f} "
+            f"by locators, {fmean(items):.1f} by evaluate"
+        )
+
+
+if __name__ == "__main__":
+    run(main())
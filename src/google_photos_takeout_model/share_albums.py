@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from asyncio import Lock, TaskGroup, run
+from itertools import cycle
+from os import environ
+
+from playwright.async_api import BrowserContext, Locator, TimeoutError  # noqa: A004
+from tqdm.asyncio import tqdm
+
+from google_photos_takeout_model import Albums, Kinds, get_albums, update_album_list
+from google_photos_takeout_model.get_media_metadata import (
+    add_progress_callbacks,
+    slow_retry,
+)
+from google_photos_takeout_model.pw import (
+    INTERACT_TIMEOUT,
+    LOGIN_TIMEOUT,
+    context,
+    locator_pool,
+    log_in_if_expired,
+)
+
+KIND: Kinds = "copied"
+"""Kind of albums to share."""
+PAGES = 8
+SHARE_WITH = environ.get("GPHOTOS_SHARE_WITH")
+"""Also share albums with this email address, if set."""
+
+SHARE_LINK = """
+() =>
+  [...document.querySelectorAll("input")]
+    .map(input => input.value)
+    .find(value => value.startsWith("https://photos.app.goo.gl/")) ?? false
+"""
+"""Get the share link once it has been created."""
+
+
+async def main(kind: Kinds = KIND, pages: int = PAGES, email: str | None = SHARE_WITH):
+    await log_in_if_expired()
+    async with context() as ctx:
+        await share_albums(ctx, kind, pages, email)
+
+
+async def share_albums(
+    ctx: BrowserContext,
+    kind: Kinds = KIND,
+    pages: int = PAGES,
+    email: str | None = SHARE_WITH,
+):
+    albs = get_albums()
+    unshared = {
+        title: url
+        for title, url in albs[kind].contents.items()
+        if title not in albs["links"].contents
+    }
+    progress = tqdm(smoothing=0, total=len(unshared))
+    async with (
+        locator_pool(ctx, min(pages, len(unshared))) as locators,
+        TaskGroup() as tg,
+    ):
+        add_progress_callbacks(
+            progress,
+            [
+                tg.create_task(share_album(loc, lock, albs, title, url, email))
+                for (title, url), (loc, lock) in zip(
+                    unshared.items(), cycle(locators), strict=False
+                )
+            ],
+        )
+    progress.close()
+
+
+async def share_album(
+    loc: Locator,
+    lock: Lock,
+    albs: dict[Kinds, Albums],
+    title: str,
+    url: str,
+    email: str | None = None,
+):
+    async with lock:
+        await slow_retry(TimeoutError)(loc.page.goto)(url)
+        await loc.page.get_by_role("button", name="Share", exact=True).click()
+        if email:
+            await share_with(loc, email)
+            await loc.page.get_by_role("button", name="Share", exact=True).click()
+        link = await create_link(loc)
+        await loc.page.keyboard.press("Escape")
+    update_album_list(albs["links"], title, link)
+
+
+async def share_with(loc: Locator, email: str):
+    # ? Add the recipient and send, waiting for the share dialog to close
+    recipient = loc.page.get_by_role("textbox", name="To")
+    await recipient.fill(email)
+    await recipient.press("Enter")
+    send = loc.page.get_by_role("button", name="Send", exact=True)
+    await send.click(timeout=INTERACT_TIMEOUT)
+    await send.wait_for(state="hidden", timeout=LOGIN_TIMEOUT)
+
+
+async def create_link(loc: Locator) -> str:
+    # ? Reuse an existing link, otherwise create one and wait for it to appear
+    if not (link := await loc.page.evaluate(SHARE_LINK)):
+        await loc.page.get_by_role("button", name="Create link").click()
+        link = await (
+            await loc.page.wait_for_function(SHARE_LINK, timeout=LOGIN_TIMEOUT)
+        ).json_value()
+    return link
+
+
+if __name__ == "__main__":
+    run(main())
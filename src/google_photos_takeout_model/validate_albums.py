@@ -0,0 +1,103 @@
+"""Find partially scraped items in album files and queue only those for repair."""
+
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from pathlib import Path
+from sys import argv
+from typing import Literal
+
+from tqdm import tqdm
+
+from google_photos_takeout_model.get_media_metadata import get_album_path
+from google_photos_takeout_model.models.merged import first_line, get_item_id
+from google_photos_takeout_model.models.scraped import Album, MediaItemMetadata
+from google_photos_takeout_model.work_queue import QUEUE, Work, WorkQueue
+
+SCRAPED = [Path(arg) for arg in argv[1:]]
+"""Album JSON files written by the scrapers."""
+PRIORITY = 1
+"""Priority of repairs, ahead of items not yet scraped."""
+DRY_RUN = False
+"""Report problems without queueing repairs."""
+
+type Problem = Literal[
+    "bad url", "no details", "blank detail", "no albums", "not in album", "lost people"
+]
+
+
+def main(paths: list[Path] = SCRAPED, dry_run: bool = DRY_RUN):
+    validate(paths, dry_run=dry_run)
+
+
+def validate(
+    paths: list[Path], queue: Path = QUEUE, dry_run: bool = DRY_RUN
+) -> Counter[Problem]:
+    """Queue items with suspicious or partial fields, returning counts of problems.
+
+    Album files are only read, so that items keep what was scraped until they are
+    scraped again from the queue, without opening their albums. Work is keyed by the
+    album file the scrapers write, whatever path the album was read from. Items without
+    a media item URL are reported but not queued, since only their albums can find them.
+    Dry runs report problems without touching the queue.
+    """
+    albums = [
+        Album.model_validate_json(path.read_text(encoding="utf-8")) for path in paths
+    ]
+    people = get_people(albums)
+    problems: Counter[Problem] = Counter()
+    repairs: list[Work] = []
+    for alb in albums:
+        album_path = get_album_path(alb.title, alb.item)
+        for idx, item in enumerate(alb.media_items_metadata):
+            if not (found := get_problems(alb, item, people)):
+                continue
+            problems.update(found)
+            # ? Items without a media item URL can only be found from their album
+            if "bad url" not in found:
+                repairs.append(Work(album_path, idx, item.item, PRIORITY))
+    for problem, count in problems.most_common():
+        tqdm.write(f"{problem}: {count}")
+    if dry_run:
+        tqdm.write(f"Would queue {len(repairs)} items for repair.")
+        return problems
+    with WorkQueue.connect(queue) as work:
+        for repair in repairs:
+            work.requeue(repair)
+    tqdm.write(f"Queued {len(repairs)} items for repair.")
+    return problems
+
+
+def get_people(albums: Iterable[Album]) -> defaultdict[str, set[str]]:
+    """Get people found in each item across albums, keyed by item ID."""
+    people: defaultdict[str, set[str]] = defaultdict(set)
+    for alb in albums:
+        for item in alb.media_items_metadata:
+            people[get_item_id(item.item)] |= set(item.people)
+    return people
+
+
+def get_problems(
+    alb: Album, item: MediaItemMetadata, people: dict[str, set[str]]
+) -> list[Problem]:
+    """Get problems with a scraped item, or none if it hasn't been scraped yet."""
+    if not (item_id := get_item_id(item.item)):
+        return ["bad url"]
+    if not (item.details or item.albums or item.people):
+        return []
+    problems: list[Problem] = []
+    if not item.details:
+        problems.append("no details")
+    elif not all(detail.strip() for detail in item.details):
+        problems.append("blank detail")
+    if not item.albums:
+        problems.append("no albums")
+    elif alb.title and alb.title not in {first_line(name) for name in item.albums}:
+        problems.append("not in album")
+    # ? People found for the same item in another album weren't loaded in this one
+    if not item.people and people.get(item_id):
+        problems.append("lost people")
+    return problems
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Persistent queue of media items left to scrape."""
+
+from __future__ import annotations
+
+from collections.abc import Generator
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from sqlite3 import Connection, connect
+from typing import Literal
+
+QUEUE = Path("queue.db")
+MAX_ATTEMPTS = 3
+"""Dead-letter items that fail this many times."""
+
+type Status = Literal["pending", "done", "dead"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work (
+    album TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (album, idx)
+);
+CREATE INDEX IF NOT EXISTS pending ON work (status, priority DESC, attempts);
+"""
+
+
+@dataclass
+class Work:
+    """Media item at `idx` in the album JSON file at `album`."""
+
+    album: Path
+    idx: int
+    item: str
+    priority: int = 0
+    attempts: int = 0
+
+
+@dataclass
+class WorkQueue:
+    """Media items to scrape, with priorities, attempt counts, and dead-lettering.
+
+    Changes are committed by `commit` and when the queue is closed without error, so
+    commit only after the scraped results themselves have been written.
+    """
+
+    con: Connection
+
+    @classmethod
+    @contextmanager
+    def connect(cls, path: Path = QUEUE) -> Generator[WorkQueue]:
+        with closing(connect(path)) as con, con:
+            con.executescript(SCHEMA)
+            yield cls(con)
+
+    def commit(self):
+        self.con.commit()
+
+    def put(self, work: Work):
+        """Queue work, raising the priority of pending work that is already queued."""
+        self.con.execute(
+            """
+            INSERT INTO work (album, idx, item, priority) VALUES (?, ?, ?, ?)
+            ON CONFLICT (album, idx) DO UPDATE SET
+                item = excluded.item,
+                priority = max(priority, excluded.priority)
+            WHERE status = 'pending'
+            """,
+            (work.album.as_posix(), work.idx, work.item, work.priority),
+        )
+
+    def requeue(self, work: Work):
+        """Queue work again regardless of its status, resetting attempts."""
+        self.con.execute(
+            """
+            INSERT INTO work (album, idx, item, priority) VALUES (?, ?, ?, ?)
+            ON CONFLICT (album, idx) DO UPDATE SET
+                item = excluded.item,
+                priority = excluded.priority,
+                attempts = 0,
+                status = 'pending',
+                error = ''
+            """,
+            (work.album.as_posix(), work.idx, work.item, work.priority),
+        )
+
+    def pending(self) -> list[Work]:
+        return [
+            Work(Path(album), idx, item, priority, attempts)
+            for album, idx, item, priority, attempts in self.con.execute(
+                """
+                SELECT album, idx, item, priority, attempts FROM work
+                WHERE status = 'pending'
+                ORDER BY priority DESC, attempts, album, idx
+                """
+            )
+        ]
+
+    def count(self, status: Status) -> int:
+        return self.con.execute(
+            "SELECT count(*) FROM work WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+    def done(self, work: Work):
+        self.set_status(work, "done")
+
+    def dead(self, work: Work, error: str):
+        self.set_status(work, "dead", error)
+
+    def fail(self, work: Work, error: str):
+        """Record a failed attempt, dead-lettering work that has failed too often."""
+        work.attempts += 1
+        self.con.execute(
+            "UPDATE work SET attempts = ?, error = ? WHERE album = ? AND idx = ?",
+            (work.attempts, error, work.album.as_posix(), work.idx),
+        )
+        if work.attempts >= MAX_ATTEMPTS:
+            self.dead(work, error)
+
+    def set_status(self, work: Work, status: Status, error: str = ""):
+        self.con.execute(
+            "UPDATE work SET status = ?, error = ? WHERE album = ? AND idx = ?",
+            (status, error, work.album.as_posix(), work.idx),
+        )
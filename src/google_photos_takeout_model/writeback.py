@@ -0,0 +1,226 @@
+"""Write takeout metadata back into media files with ExifTool."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import suppress
+from datetime import UTC, datetime, tzinfo
+from html import escape
+from json import loads
+from math import isclose
+from os import cpu_count
+from pathlib import Path
+from subprocess import run
+from sys import argv
+
+from more_itertools import chunked
+from tqdm import tqdm
+
+from google_photos_takeout_model.models.albums import get_albums
+from google_photos_takeout_model.models.media_items import MediaItem
+
+TAKEOUT = Path(argv[1]) if argv[1:] else Path("takeout")
+EXIFTOOL = "exiftool"
+CHUNK = 200
+"""Files per ExifTool run, amortizing its startup over many files."""
+WORKERS = cpu_count() or 1
+IMAGES = (".jpg", ".jpeg", ".heic", ".heif", ".png", ".tif", ".tiff")
+VIDEOS = (".mp4", ".m4v", ".mov", ".3gp")
+EXIF_TIME = "%Y:%m:%d %H:%M:%S"
+DATE_TIME_ORIGINAL = "EXIF:DateTimeOriginal"
+OFFSET_TIME_ORIGINAL = "EXIF:OffsetTimeOriginal"
+COMMON = ["-charset", "filename=utf8", "-n"]
+"""Options for reading and writing, with numeric values and UTF-8 paths."""
+
+type Value = str | float | list[str]
+type Tags = dict[str, Value]
+"""Tag values keyed by family 0 group and name, e.g. `EXIF:DateTimeOriginal`."""
+
+
+def main(takeout: Path = TAKEOUT, workers: int = WORKERS):
+    writeback(
+        (item for album in get_albums(takeout) for item in album.media_items), workers
+    )
+
+
+def writeback(media_items: Iterable[MediaItem], workers: int = WORKERS) -> int:
+    """Embed metadata in media files, returning the number of files written.
+
+    Files are handled in chunks, each by one ExifTool run in a worker process. Only
+    files whose tags differ are rewritten, and ExifTool rewrites metadata in place
+    without re-encoding the media.
+    """
+    files = [
+        (item.path, taken, tags)
+        for item in media_items
+        for taken, tags in (get_tags(item),)
+        if taken or tags
+    ]
+    written = 0
+    with (
+        ProcessPoolExecutor(workers) as executor,
+        tqdm(total=len(files), unit="file", smoothing=0) as progress,
+    ):
+        for future in as_completed(
+            executor.submit(write_chunk, chunk) for chunk in chunked(files, CHUNK)
+        ):
+            chunk_written, chunk_total = future.result()
+            written += chunk_written
+            progress.update(chunk_total)
+    tqdm.write(f"Wrote {written} of {len(files)} files.")
+    return written
+
+
+def get_tags(media_item: MediaItem) -> tuple[datetime | None, Tags]:
+    """Get the capture time and other tags to embed for a media item.
+
+    Capture times of images are compared with those in the file before they're written,
+    so they're returned apart from other tags. Both are empty if the format isn't
+    supported.
+    """
+    suffix = media_item.path.suffix.casefold()
+    taken = datetime.fromtimestamp(int(media_item.photo_taken_time.timestamp), UTC)
+    geo = media_item.geo_data
+    tags: Tags = {}
+    if suffix in IMAGES:
+        if geo.latitude or geo.longitude:
+            tags |= {
+                "EXIF:GPSLatitude": abs(geo.latitude),
+                "EXIF:GPSLatitudeRef": "N" if geo.latitude >= 0 else "S",
+                "EXIF:GPSLongitude": abs(geo.longitude),
+                "EXIF:GPSLongitudeRef": "E" if geo.longitude >= 0 else "W",
+                "EXIF:GPSAltitude": abs(geo.altitude),
+                "EXIF:GPSAltitudeRef": "0" if geo.altitude >= 0 else "1",
+            }
+    elif suffix in VIDEOS:
+        # ? QuickTime dates are stored in UTC
+        tags |= {"QuickTime:CreateDate": taken.strftime(EXIF_TIME)}
+        if geo.latitude or geo.longitude:
+            tags |= {
+                "QuickTime:GPSCoordinates": f"{geo.latitude} {geo.longitude} {geo.altitude}"
+            }
+    else:
+        return None, {}
+    if media_item.description:
+        tags |= {"XMP:Description": media_item.description}
+    if people := [person.name for person in media_item.people]:
+        tags |= {"XMP:PersonInImage": people}
+    return (taken if suffix in IMAGES else None), tags
+
+
+def write_chunk(files: list[tuple[Path, datetime | None, Tags]]) -> tuple[int, int]:
+    """Write tags that differ for a chunk of files, returning written and total."""
+    current = read_tags([path for path, _, _ in files])
+    args: list[str] = []
+    written = 0
+    for path, taken, tags in files:
+        if not (
+            changed := get_changed_tags(taken, tags, current.get(path.as_posix(), {}))
+        ):
+            continue
+        written += 1
+        args.extend(["-overwrite_original", "-P", "-E", *COMMON])
+        for tag, value in changed.items():
+            if isinstance(value, list):
+                # ? Repeated assignments replace a list tag with all items
+                args.extend(f"-{tag}={encode(item)}" for item in value)
+            else:
+                args.append(f"-{tag}={encode(value)}")
+        args.extend([path.as_posix(), "-execute"])
+    if args:
+        exiftool(args)
+    return written, len(files)
+
+
+def get_changed_tags(taken: datetime | None, tags: Tags, current: Tags) -> Tags:
+    """Get tags that differ from those of a file, with its capture time if it differs."""
+    changed = {
+        tag: value
+        for tag, value in tags.items()
+        if not matches(value, current.get(tag))
+    }
+    if taken:
+        changed |= get_time_tags(taken, current)
+    return changed
+
+
+def get_time_tags(taken: datetime, current: Tags) -> Tags:
+    """Get capture time tags, unless the file already has a capture time at that instant.
+
+    Capture times without an offset are taken to be in local time. Times are written in
+    the offset the file already has, or in local time, so camera files keep their local
+    capture times.
+    """
+    offset = get_offset(current.get(OFFSET_TIME_ORIGINAL))
+    with suppress(KeyError, ValueError):
+        original = datetime.strptime(str(current[DATE_TIME_ORIGINAL]), EXIF_TIME)
+        if original.replace(tzinfo=offset).astimezone() == taken:
+            return {}
+    local = taken.astimezone(offset)
+    return {
+        DATE_TIME_ORIGINAL: local.strftime(EXIF_TIME),
+        OFFSET_TIME_ORIGINAL: local.strftime("%:z"),
+    }
+
+
+def get_offset(value: Value | None) -> tzinfo | None:
+    """Get the time zone of an offset tag like `+02:00`, if it holds one."""
+    with suppress(ValueError):
+        return datetime.strptime(str(value), "%z").tzinfo
+    return None
+
+
+def read_tags(paths: list[Path]) -> dict[str, dict[str, Value]]:
+    """Read tags of files, keyed by their POSIX paths."""
+    return {
+        entry["SourceFile"]: entry
+        for entry in loads(
+            exiftool(["-json", "-G0", *COMMON, *(p.as_posix() for p in paths)]) or "[]"
+        )
+    }
+
+
+def exiftool(args: list[str]) -> str:
+    """Run ExifTool with arguments passed through an argument file on stdin.
+
+    Errors for individual files are reported without stopping the run.
+    """
+    result = run(
+        args=[EXIFTOOL, "-@", "-"],
+        input="\n".join(args),
+        capture_output=True,
+        check=False,
+        encoding="utf-8",
+    )
+    for line in result.stderr.splitlines():
+        tqdm.write(line)
+    return result.stdout
+
+
+def matches(expected: Value, actual: Value | None) -> bool:
+    if actual is None:
+        return False
+    if isinstance(expected, list):
+        return expected == (actual if isinstance(actual, list) else [str(actual)])
+    if isinstance(expected, int | float):
+        return isinstance(actual, int | float) and isclose(
+            expected, actual, abs_tol=1e-6
+        )
+    if isinstance(actual, str) and len(numbers := actual.split()) > 1:
+        # ? Coordinates read back as space-separated numbers
+        with suppress(ValueError):
+            return all(
+                isclose(float(e), float(a), abs_tol=1e-6)
+                for e, a in zip(expected.split(), numbers, strict=True)
+            )
+    return expected == str(actual)
+
+
+def encode(value: str | float) -> str:
+    """Encode a value for an argument file, escaping newlines as HTML entities."""
+    return escape(str(value), quote=False).replace("\n", "&#xa;")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Takeout archive parts indexed and read in place."""
+
+from io import BytesIO
+from pathlib import Path
+from tarfile import TarInfo
+from tarfile import open as open_tar
+from zipfile import ZipFile
+
+import pytest
+
+from google_photos_takeout_model.models.archives import TAKEOUT_ROOT, Archive
+
+ALBUM = TAKEOUT_ROOT / "Album"
+MEMBERS = {
+    ALBUM / "metadata.json": b'{"title": "Album"}',
+    ALBUM / "photo.jpg": bytes(range(256)) * 8,
+}
+
+
+def write_zip(path: Path) -> Path:
+    with ZipFile(path, "w") as part:
+        for name, data in MEMBERS.items():
+            part.writestr(name.as_posix(), data)
+    return path
+
+
+def write_tar(path: Path, compressed: bool = False) -> Path:
+    with open_tar(path, "w:gz" if compressed else "w") as part:
+        for name, data in MEMBERS.items():
+            info = TarInfo(name.as_posix())
+            info.size = len(data)
+            part.addfile(info, BytesIO(data))
+    return path
+
+
+@pytest.mark.parametrize(
+    ("name", "write"),
+    [
+        ("takeout.zip", write_zip),
+        ("takeout.tar", write_tar),
+        ("takeout.tgz", lambda path: write_tar(path, compressed=True)),
+    ],
+)
+def test_index_and_read(tmp_path: Path, name: str, write):
+    with Archive.from_paths([write(tmp_path / name)]) as archive:
+        assert archive.is_dir(TAKEOUT_ROOT)
+        assert archive.iterdir(TAKEOUT_ROOT) == [ALBUM]
+        assert archive.iterdir(ALBUM) == sorted(MEMBERS)
+        for path, data in MEMBERS.items():
+            assert archive.is_file(path)
+            assert archive.read_bytes(path) == data
+
+
+def test_tar_members_read_at_offsets(tmp_path: Path):
+    with Archive.from_paths([write_tar(tmp_path / "takeout.tar")]) as archive:
+        photo = archive.members[ALBUM / "photo.jpg"]
+        assert photo.offset is not None
+        assert photo.data is None
+
+
+def test_compressed_tar_caches_only_sidecars(tmp_path: Path):
+    with Archive.from_paths([
+        write_tar(tmp_path / "takeout.tgz", compressed=True)
+    ]) as archive:
+        assert (
+            archive.members[ALBUM / "metadata.json"].data
+            == MEMBERS[ALBUM / "metadata.json"]
+        )
+        photo = archive.members[ALBUM / "photo.jpg"]
+        assert photo.offset is None
+        assert photo.data is None
+
+
+def test_parts_merge(tmp_path: Path):
+    zip_part = tmp_path / "takeout-1.zip"
+    with ZipFile(zip_part, "w") as part:
+        part.writestr((ALBUM / "other.jpg").as_posix(), b"other")
+    parts = [zip_part, write_tar(tmp_path / "takeout-2.tar")]
+    with Archive.from_paths(parts) as archive:
+        assert archive.iterdir(ALBUM) == sorted([*MEMBERS, ALBUM / "other.jpg"])
+        assert archive.read_bytes(ALBUM / "other.jpg") == b"other"
@@ -0,0 +1,34 @@
+"""Fingerprints parsed from album pages as served."""
+
+from google_photos_takeout_model.changes import parse_fingerprint
+
+
+def get_page(description: str, items: list[str]) -> str:
+    return "".join([
+        '<meta property="og:title" content="Trip &amp; friends">',
+        f'<meta property="og:description" content="{description}">',
+        *(f'<a href="./photo/{item}"></a>' for item in [*items, *items]),
+    ])
+
+
+def test_every_item_linked():
+    fingerprint = parse_fingerprint(
+        get_page("3 items added to shared album", ["a", "b", "c"])
+    )
+    assert fingerprint.title == "Trip & friends"
+    assert fingerprint.count == 3
+    assert (fingerprint.first, fingerprint.last) == ("a", "c")
+
+
+def test_only_first_items_linked():
+    fingerprint = parse_fingerprint(
+        get_page("1,234 items added to shared album", ["a", "b"])
+    )
+    assert fingerprint.count == 1234
+    assert (fingerprint.first, fingerprint.last) == ("a", "")
+
+
+def test_no_count():
+    fingerprint = parse_fingerprint(get_page("Many items added to shared album", []))
+    assert fingerprint.count == 0
+    assert (fingerprint.first, fingerprint.last) == ("", "")
@@ -0,0 +1,118 @@
+"""Downloads against the local stand-in server."""
+
+from asyncio import run
+from base64 import b64encode
+from collections.abc import Iterator
+from hashlib import md5
+from http import HTTPStatus
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+import pytest
+
+from google_photos_takeout_model import download
+from google_photos_takeout_model.download import PART, DownloadError, fetch
+from google_photos_takeout_model.pw import request_context
+from google_photos_takeout_model.replay import serve
+
+DATA = bytes(range(256)) * 64
+NAME = "photo.jpg"
+CHUNK = 1000
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    root = tmp_path / "served"
+    root.mkdir()
+    (root / NAME).write_bytes(DATA)
+    return root
+
+
+@pytest.fixture
+def base_url(root: Path) -> Iterator[str]:
+    with serve(root) as base_url:
+        yield base_url
+
+
+@pytest.fixture
+def starts(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Offsets of the ranges requested, in small chunks so files take several."""
+    starts: list[int] = []
+    get_range = download.get_range
+
+    async def get_recorded_range(request, url: str, start: int):
+        starts.append(start)
+        return await get_range(request, url, start)
+
+    monkeypatch.setattr(download, "CHUNK", CHUNK)
+    monkeypatch.setattr(download, "get_range", get_recorded_range)
+    return starts
+
+
+def fetch_served(tmp_path: Path, url: str) -> Path:
+    async def fetch_with_request_context() -> Path:
+        async with request_context(tmp_path / "storage-state.json") as request:
+            return await fetch(request, url, tmp_path / "downloads", "item")
+
+    return run(fetch_with_request_context())
+
+
+def get_part(tmp_path: Path) -> Path:
+    part = tmp_path / "downloads" / f"item{PART}"
+    part.parent.mkdir(parents=True, exist_ok=True)
+    return part
+
+
+def test_fetch_in_ranges(tmp_path: Path, base_url: str, starts: list[int]):
+    path = fetch_served(tmp_path, f"{base_url}/{NAME}")
+    assert path.name == NAME
+    assert path.read_bytes() == DATA
+    assert starts == list(range(0, len(DATA), CHUNK))
+    assert not get_part(tmp_path).exists()
+
+
+def test_fetch_resumes_from_last_byte(tmp_path: Path, base_url: str, starts: list[int]):
+    get_part(tmp_path).write_bytes(DATA[:5000])
+    assert fetch_served(tmp_path, f"{base_url}/{NAME}").read_bytes() == DATA
+    assert starts[0] == 4999
+
+
+def test_fetch_finishes_complete_part(tmp_path: Path, base_url: str, starts: list[int]):
+    get_part(tmp_path).write_bytes(DATA)
+    assert fetch_served(tmp_path, f"{base_url}/{NAME}").read_bytes() == DATA
+    assert starts == [len(DATA) - 1]
+
+
+def test_fetch_empty_file(tmp_path: Path, root: Path, base_url: str):
+    (root / "empty.jpg").write_bytes(b"")
+    path = fetch_served(tmp_path, f"{base_url}/empty.jpg")
+    assert path.name == "item"
+    assert path.read_bytes() == b""
+
+
+def test_fetch_discards_checksum_mismatch(
+    tmp_path: Path, base_url: str, starts: list[int]
+):
+    part = get_part(tmp_path)
+    part.write_bytes(bytes(5000))
+    with pytest.raises(DownloadError, match="Checksum mismatch"):
+        fetch_served(tmp_path, f"{base_url}/{NAME}")
+    assert not part.exists()
+
+
+def test_fetch_keeps_existing_file(tmp_path: Path, base_url: str):
+    (tmp_path / "downloads").mkdir()
+    (tmp_path / "downloads" / NAME).write_bytes(b"other")
+    path = fetch_served(tmp_path, f"{base_url}/{NAME}")
+    assert path.name == "photo-item.jpg"
+    assert (tmp_path / "downloads" / NAME).read_bytes() == b"other"
+
+
+def test_stand_in_serves_ranges_with_checksums(base_url: str):
+    checksum = b64encode(md5(DATA, usedforsecurity=False).digest()).decode()
+    request = Request(f"{base_url}/{NAME}", headers={"Range": "bytes=10-19"})  # noqa: S310
+    with urlopen(request) as response:  # noqa: S310
+        assert response.status == HTTPStatus.PARTIAL_CONTENT
+        assert response.headers["Content-Range"] == f"bytes 10-19/{len(DATA)}"
+        assert response.headers["x-goog-hash"] == f"md5={checksum}"
+        assert response.read() == DATA[10:20]
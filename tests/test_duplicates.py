@@ -0,0 +1,31 @@
+"""Perceptual hashes searched through the multi-index."""
+
+from random import Random
+
+from google_photos_takeout_model.models.duplicates import DISTANCE, MultiIndex
+
+BITS = 64
+
+
+def test_search_matches_brute_force():
+    rng = Random(0)  # noqa: S311
+    base = [rng.getrandbits(BITS) for _ in range(20)]
+    # ? Flip up to twice the radius of bits, so some neighbors are just out of reach
+    hashes = [
+        phash ^ sum(1 << bit for bit in rng.sample(range(BITS), flips))
+        for phash in base
+        for flips in range(2 * DISTANCE + 1)
+    ]
+    index = MultiIndex()
+    for idx, phash in enumerate(hashes):
+        index.add(phash, idx)
+    for phash in hashes:
+        assert index.search(phash) == {
+            idx
+            for idx, other in enumerate(hashes)
+            if (phash ^ other).bit_count() <= DISTANCE
+        }
+
+
+def test_search_empty_index():
+    assert not MultiIndex().search(0)
@@ -0,0 +1,7 @@
+"""Media item timelines clustered into events."""
+
+from google_photos_takeout_model.models.events import cluster
+
+
+def test_cluster_no_items():
+    assert cluster([]) == []
@@ -0,0 +1,114 @@
+"""Media headers probed from synthetic files."""
+
+from datetime import UTC, datetime
+from io import BytesIO
+from pathlib import Path
+from struct import pack
+
+from PIL import Image
+
+from google_photos_takeout_model.models.probes import (
+    DATE_TIME_ORIGINAL,
+    EXIF_IFD,
+    ORIENTATION,
+    QUICKTIME_EPOCH,
+    get_probe,
+    get_probes,
+)
+
+WIDTH, HEIGHT = 123, 45
+TAKEN = datetime(2021, 6, 5, 4, 3, 2)
+
+
+def box(kind: bytes, payload: bytes) -> bytes:
+    return pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def full_box(kind: bytes, payload: bytes, version: int = 0, flags: int = 0) -> bytes:
+    return box(kind, pack(">I", version << 24 | flags) + payload)
+
+
+def write_jpeg(path: Path, orientation: int = 1) -> Path:
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    exif.get_ifd(EXIF_IFD)[DATE_TIME_ORIGINAL] = f"{TAKEN:%Y:%m:%d %H:%M:%S}"
+    Image.new("RGB", (WIDTH, HEIGHT)).save(path, exif=exif)
+    return path
+
+
+def test_jpeg(tmp_path: Path):
+    probe = get_probe(write_jpeg(tmp_path / "photo.jpg"))
+    assert probe.format == "jpeg"
+    assert (probe.width, probe.height) == (WIDTH, HEIGHT)
+    assert probe.taken == TAKEN
+
+
+def test_jpeg_rotated_by_orientation(tmp_path: Path):
+    probe = get_probe(write_jpeg(tmp_path / "photo.jpg", orientation=6))
+    assert (probe.width, probe.height) == (HEIGHT, WIDTH)
+
+
+def test_jpeg_malformed_exif(tmp_path: Path):
+    exif = b"Exif\0\0XX" + bytes(20)
+    path = tmp_path / "bad.jpg"
+    path.write_bytes(
+        b"\xff\xd8\xff\xe1" + pack(">H", 2 + len(exif)) + exif + b"\xff\xd9"
+    )
+    good = write_jpeg(tmp_path / "good.jpg")
+    bad_probe, good_probe = get_probes([path, good])
+    assert bad_probe.format == "jpeg"
+    assert bad_probe.taken is None
+    assert good_probe.taken == TAKEN
+
+
+def test_png(tmp_path: Path):
+    buffer = BytesIO()
+    Image.new("RGB", (WIDTH, HEIGHT)).save(buffer, "png")
+    (path := tmp_path / "image.png").write_bytes(buffer.getvalue())
+    probe = get_probe(path)
+    assert probe.format == "png"
+    assert (probe.width, probe.height) == (WIDTH, HEIGHT)
+
+
+def test_empty(tmp_path: Path):
+    (path := tmp_path / "empty.jpg").write_bytes(b"")
+    probe = get_probe(path)
+    assert probe.size == 0
+    assert probe.format == "unknown"
+
+
+def test_quicktime_duration_and_time(tmp_path: Path):
+    created = int((datetime(2020, 1, 2, tzinfo=UTC) - QUICKTIME_EPOCH).total_seconds())
+    mvhd = full_box(b"mvhd", pack(">IIII", created, created, 600, 1800) + bytes(80))
+    tkhd = full_box(b"tkhd", bytes(72) + pack(">II", WIDTH << 16, HEIGHT << 16))
+    (path := tmp_path / "video.mp4").write_bytes(
+        box(b"ftyp", b"isom" + bytes(4)) + box(b"moov", mvhd + box(b"trak", tkhd))
+    )
+    probe = get_probe(path)
+    assert probe.format == "isobmff"
+    assert probe.duration == 3
+    assert probe.taken == datetime(2020, 1, 2, tzinfo=UTC)
+    assert (probe.width, probe.height) == (WIDTH, HEIGHT)
+
+
+def test_heic_primary_image_rotated(tmp_path: Path):
+    # ? Thumbnail is item 2, listed first so that only the primary item's size counts
+    ipco = box(
+        b"ipco",
+        full_box(b"ispe", pack(">II", 16, 16))
+        + full_box(b"ispe", pack(">II", WIDTH, HEIGHT))
+        + box(b"irot", b"\x01"),
+    )
+    # ? Associations are one-based property indices, the high bit marking essential
+    ipma = full_box(
+        b"ipma", pack(">I", 2) + pack(">HBB", 2, 1, 1) + pack(">HBBB", 1, 2, 0x82, 3)
+    )
+    meta = full_box(
+        b"meta", full_box(b"pitm", pack(">H", 1)) + box(b"iprp", ipco + ipma)
+    )
+    (path := tmp_path / "image.heic").write_bytes(
+        box(b"ftyp", b"heic" + bytes(4)) + meta
+    )
+    probe = get_probe(path)
+    assert probe.format == "isobmff"
+    assert (probe.width, probe.height) == (HEIGHT, WIDTH)